@@ -7,35 +7,17 @@
   - 未通过时输出 REVIEW_REJECTED + 问题列表，通知代码编写智能体修复
   - 通过时输出 REVIEW_APPROVED
 """
+from functools import lru_cache
+
 from autogen_agentchat.agents import AssistantAgent
 from autogen_core.models import ChatCompletionClient
 
 from rules.rules_manager import RulesManager
 
 
-def create_code_reviewer(
-    model_client: ChatCompletionClient,
-    file_tools: list,
-    rules_manager: RulesManager,
-) -> AssistantAgent:
-    """创建代码审核智能体。
-
-    Args:
-        model_client: LLM 客户端
-        file_tools: 文件读取工具列表
-        rules_manager: 规则管理器实例
-
-    Returns:
-        配置好的 AssistantAgent
-    """
-    rules_prompt = rules_manager.get_rules_prompt()
-    coding_rules_prompt = rules_manager.get_coding_rules_prompt()
-
-    system_message = f"""{rules_prompt}
-
-{coding_rules_prompt}
-
-你是 **前端代码审核专家**。
+# 角色 + 工作流说明 — 会话期间不变的静态块，与可变的规则块分离，
+# 保持字节级稳定以便命中上游 provider 的 prompt cache
+_STATIC_REVIEWER_SUFFIX = """你是 **前端代码审核专家**。
 
 ━━━━━━━━━━━━━━━━━━━━
 核心职责
@@ -84,6 +66,36 @@ def create_code_reviewer(
 - 审核未通过时，在报告最后一行输出: REVIEW_REJECTED
 """
 
+
+@lru_cache(maxsize=None)
+def _build_reviewer_sysmsg(rules_manager: RulesManager, rules_ver: int) -> str:
+    """渲染审核智能体的 system_message（按规则版本缓存）。
+
+    可变的规则块在前，静态的角色块在后，规则未变时整段字节级一致。
+    """
+    rules_prompt = rules_manager.get_rules_prompt()
+    coding_rules_prompt = rules_manager.get_coding_rules_prompt()
+    return f"{rules_prompt}\n\n{coding_rules_prompt}\n\n{_STATIC_REVIEWER_SUFFIX}"
+
+
+def create_code_reviewer(
+    model_client: ChatCompletionClient,
+    file_tools: list,
+    rules_manager: RulesManager,
+) -> AssistantAgent:
+    """创建代码审核智能体。
+
+    Args:
+        model_client: LLM 客户端
+        file_tools: 文件读取工具列表
+        rules_manager: 规则管理器实例
+
+    Returns:
+        配置好的 AssistantAgent
+    """
+    # system_message 按 (管理器实例, 规则版本) 缓存，重复构建时直接复用
+    system_message = _build_reviewer_sysmsg(rules_manager, rules_manager.version)
+
     return AssistantAgent(
         name="code_reviewer",
         description=(
@@ -7,34 +7,17 @@
   - 使用 write_file 工具将代码写入 output/ 目录
   - 收到审核反馈后针对性修改代码
 """
+from functools import lru_cache
+
 from autogen_agentchat.agents import AssistantAgent
 from autogen_core.models import ChatCompletionClient
 
 from rules.rules_manager import RulesManager
 
 
-def create_code_writer(
-    model_client: ChatCompletionClient,
-    knowledge_tools: list,
-    file_tools: list,
-    rules_manager: RulesManager,
-) -> AssistantAgent:
-    """创建代码编写智能体。
-
-    Args:
-        model_client: LLM 客户端
-        knowledge_tools: 知识库查询 / 写入工具列表
-        file_tools: 文件读写工具列表
-        rules_manager: 规则管理器实例
-
-    Returns:
-        配置好的 AssistantAgent
-    """
-    rules_prompt = rules_manager.get_rules_prompt()
-
-    system_message = f"""{rules_prompt}
-
-你是 **前端代码编写专家**。
+# 角色 + 工作流说明 — 会话期间不变的静态块，与可变的规则块分离，
+# 保持字节级稳定以便命中上游 provider 的 prompt cache
+_STATIC_WRITER_SUFFIX = """你是 **前端代码编写专家**。
 
 ━━━━━━━━━━━━━━━━━━━━
 核心职责
@@ -90,6 +73,37 @@ def create_code_writer(
 - 说明修改了哪些内容
 """
 
+
+@lru_cache(maxsize=None)
+def _build_writer_sysmsg(rules_manager: RulesManager, rules_ver: int) -> str:
+    """渲染编写智能体的 system_message（按规则版本缓存）。
+
+    可变的规则块在前，静态的角色块在后，规则未变时整段字节级一致。
+    """
+    rules_prompt = rules_manager.get_rules_prompt()
+    return f"{rules_prompt}\n\n{_STATIC_WRITER_SUFFIX}"
+
+
+def create_code_writer(
+    model_client: ChatCompletionClient,
+    knowledge_tools: list,
+    file_tools: list,
+    rules_manager: RulesManager,
+) -> AssistantAgent:
+    """创建代码编写智能体。
+
+    Args:
+        model_client: LLM 客户端
+        knowledge_tools: 知识库查询 / 写入工具列表
+        file_tools: 文件读写工具列表
+        rules_manager: 规则管理器实例
+
+    Returns:
+        配置好的 AssistantAgent
+    """
+    # system_message 按 (管理器实例, 规则版本) 缓存，重复构建时直接复用
+    system_message = _build_writer_sysmsg(rules_manager, rules_manager.version)
+
     return AssistantAgent(
         name="code_writer",
         description=(
@@ -99,5 +113,7 @@ def create_code_writer(
         model_client=model_client,
         system_message=system_message,
         tools=knowledge_tools + file_tools,
-        reflect_on_tool_use=True,
+        # write_file / add_knowledge 的返回文本自描述，
+        # 反思会在每次工具调用后多付一次 LLM 往返，关闭
+        reflect_on_tool_use=False,
     )
@@ -8,34 +8,17 @@ Figma 页面结构分析智能体
 
 注意：本智能体 **不负责** 保存截图或图片，截图对比由 result_reviewer 负责。
 """
+from functools import lru_cache
+
 from autogen_agentchat.agents import AssistantAgent
 from autogen_core.models import ChatCompletionClient
 
 from rules.rules_manager import RulesManager
 
 
-def create_figma_analyzer(
-    model_client: ChatCompletionClient,
-    figma_tools: list,
-    knowledge_tools: list,
-    rules_manager: RulesManager,
-) -> AssistantAgent:
-    """创建 Figma 页面结构分析智能体。
-
-    Args:
-        model_client: LLM 客户端
-        figma_tools: Figma MCP 工具列表
-        knowledge_tools: 知识库查询工具列表
-        rules_manager: 规则管理器实例
-
-    Returns:
-        配置好的 AssistantAgent
-    """
-    rules_prompt = rules_manager.get_rules_prompt()
-
-    system_message = f"""{rules_prompt}
-
-你是 **Figma 页面结构分析专家**。
+# 角色 + 工作流说明 — 会话期间不变的静态块，与可变的规则块分离，
+# 保持字节级稳定以便命中上游 provider 的 prompt cache
+_STATIC_ANALYZER_SUFFIX = """你是 **Figma 页面结构分析专家**。
 
 ━━━━━━━━━━━━━━━━━━━━
 核心职责
@@ -88,6 +71,37 @@ def create_figma_analyzer(
 - 不要反复调用同一个工具，如果一个工具调用失败或返回空结果，就用已有信息完成分析
 """
 
+
+@lru_cache(maxsize=None)
+def _build_analyzer_sysmsg(rules_manager: RulesManager, rules_ver: int) -> str:
+    """渲染分析智能体的 system_message（按规则版本缓存）。
+
+    可变的规则块在前，静态的角色块在后，规则未变时整段字节级一致。
+    """
+    rules_prompt = rules_manager.get_rules_prompt()
+    return f"{rules_prompt}\n\n{_STATIC_ANALYZER_SUFFIX}"
+
+
+def create_figma_analyzer(
+    model_client: ChatCompletionClient,
+    figma_tools: list,
+    knowledge_tools: list,
+    rules_manager: RulesManager,
+) -> AssistantAgent:
+    """创建 Figma 页面结构分析智能体。
+
+    Args:
+        model_client: LLM 客户端
+        figma_tools: Figma MCP 工具列表
+        knowledge_tools: 知识库查询工具列表
+        rules_manager: 规则管理器实例
+
+    Returns:
+        配置好的 AssistantAgent
+    """
+    # system_message 按 (管理器实例, 规则版本) 缓存，重复构建时直接复用
+    system_message = _build_analyzer_sysmsg(rules_manager, rules_manager.version)
+
     return AssistantAgent(
         name="figma_analyzer",
         description=(
@@ -97,5 +111,6 @@ def create_figma_analyzer(
         model_client=model_client,
         system_message=system_message,
         tools=figma_tools + knowledge_tools,
-        reflect_on_tool_use=True,
+        # 分析报告本身就是对工具结果的加工，无需额外反思往返
+        reflect_on_tool_use=False,
     )
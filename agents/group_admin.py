@@ -9,7 +9,8 @@
 本模块不创建独立的 AssistantAgent 参与群聊，
 而是通过 selector_prompt + selector_func 嵌入 SelectorGroupChat 的调度机制中。
 """
-from typing import Optional, Sequence
+import re
+from typing import Optional, Sequence, Tuple
 
 # ============================================================
 # 管理员选择器提示词
@@ -62,6 +63,25 @@ def create_selector_prompt(participants_info: str) -> str:
 # 自定义选择器函数（优先于 LLM 选择，返回 None 时回退到 LLM）
 # ============================================================
 
+# 审核标记固定出现在报告末尾，只需检查消息尾部即可判断状态转换
+_CONTENT_TAIL_CHARS = 512
+
+# 所有审核标记合并为一个预编译的交替模式，对消息尾部单次扫描收集命中集合，
+# 新增状态标记时只需扩充此模式，无需增加逐标记的 `in` 检查
+_MARKER_RE = re.compile(r"REVIEW_APPROVED|REVIEW_REJECTED|RESULT_REJECTED")
+
+# 确定性状态转换表：(发言者, 审核标记, 下一个智能体)，按优先级排序。
+# RESULT_APPROVED 不在表中 — 由终止条件 TextMentionTermination 捕获。
+# 冻结元组 + 单次遍历，无函数间接调用，新增规则只需加一行
+_TRANSITION_RULES: Tuple[Tuple[str, str, str], ...] = (
+    ("code_reviewer", "REVIEW_APPROVED", "result_reviewer"),
+    ("code_reviewer", "REVIEW_REJECTED", "code_writer"),
+    ("result_reviewer", "RESULT_REJECTED", "code_writer"),
+)
+
+# 只有这些发言者的消息需要扫描审核标记
+_RULE_SOURCES = frozenset(src for src, _, _ in _TRANSITION_RULES)
+
 
 def custom_selector_func(messages: Sequence) -> Optional[str]:
     """基于对话历史的确定性调度逻辑。
@@ -69,6 +89,9 @@ def custom_selector_func(messages: Sequence) -> Optional[str]:
     对于明确的状态转换（如审核通过/未通过），直接返回下一个智能体名称。
     对于需要判断的场景，返回 None 让 LLM 选择。
 
+    先按 source 过滤，只在需要时检查消息尾部的审核标记，
+    避免每条消息都完整字符串化多 KB 的工具调用内容。
+
     Args:
         messages: 当前对话的消息序列
 
@@ -80,32 +103,20 @@ def custom_selector_func(messages: Sequence) -> Optional[str]:
 
     last_msg = messages[-1]
     last_source = getattr(last_msg, "source", "")
-    last_content = str(getattr(last_msg, "content", ""))
-
-    # ------------------------------------------------------------------
-    # 确定性转换
-    # ------------------------------------------------------------------
-
-    # 代码审核通过 → 结果审核
-    if last_source == "code_reviewer" and "REVIEW_APPROVED" in last_content:
-        return "result_reviewer"
-
-    # 代码审核未通过 → 回到代码编写
-    if last_source == "code_reviewer" and "REVIEW_REJECTED" in last_content:
-        return "code_writer"
-
-    # 结果审核通过 → 任务即将完成（由终止条件处理）
-    # result_reviewer 输出 RESULT_APPROVED 后，终止条件 TextMentionTermination 会捕获
-
-    # 结果审核未通过 → 回到代码编写
-    if last_source == "result_reviewer" and "RESULT_REJECTED" in last_content:
-        return "code_writer"
 
-    # 代码编写完成 → 代码审核
+    # 代码编写完成 → 代码审核（无需检查内容）
     if last_source == "code_writer":
         return "code_reviewer"
 
-    # ------------------------------------------------------------------
-    # 其他场景交给 LLM 判断
-    # ------------------------------------------------------------------
+    if last_source not in _RULE_SOURCES:
+        # 其他场景交给 LLM 判断
+        return None
+
+    content = getattr(last_msg, "content", "")
+    if not isinstance(content, str):
+        content = str(content)
+    hits = frozenset(_MARKER_RE.findall(content[-_CONTENT_TAIL_CHARS:]))
+    for src, marker, next_agent in _TRANSITION_RULES:
+        if src == last_source and marker in hits:
+            return next_agent
     return None
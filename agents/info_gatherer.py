@@ -19,7 +19,9 @@ def create_info_gatherer(
 
     Args:
         input_func: 自定义输入函数，默认为 None（使用标准 input()）。
-                    签名: (prompt: str) -> str
+                    同步签名: (prompt: str) -> str（在线程池中执行）；
+                    也可传协程函数 (prompt, cancellation_token) -> str，
+                    UserProxyAgent 会直接 await，不经线程池。
 
     Returns:
         配置好的 UserProxyAgent
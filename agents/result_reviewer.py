@@ -7,38 +7,17 @@
   - 调用 SSIM 对比工具计算相似度
   - 相似度 < 70% 则输出 RESULT_REJECTED，通知代码编写智能体优化
 """
+from functools import lru_cache
+
 from autogen_agentchat.agents import AssistantAgent
 from autogen_core.models import ChatCompletionClient
 
 from rules.rules_manager import RulesManager
 
 
-def create_result_reviewer(
-    model_client: ChatCompletionClient,
-    figma_tools: list,
-    browser_tools: list,
-    image_compare_tools: list,
-    file_tools: list,
-    rules_manager: RulesManager,
-) -> AssistantAgent:
-    """创建结果审核智能体。
-
-    Args:
-        model_client: LLM 客户端
-        figma_tools: Figma MCP 工具列表
-        browser_tools: Playwright Browser MCP 工具列表
-        image_compare_tools: 截图对比工具列表
-        file_tools: 文件/图片保存工具列表
-        rules_manager: 规则管理器实例
-
-    Returns:
-        配置好的 AssistantAgent
-    """
-    rules_prompt = rules_manager.get_rules_prompt()
-
-    system_message = f"""{rules_prompt}
-
-你是 **页面还原度审核专家**。
+# 角色 + 工作流说明 — 会话期间不变的静态块，与可变的规则块分离，
+# 保持字节级稳定以便命中上游 provider 的 prompt cache
+_STATIC_RESULT_SUFFIX = """你是 **页面还原度审核专家**。
 
 ━━━━━━━━━━━━━━━━━━━━
 核心职责
@@ -99,6 +78,41 @@ def create_result_reviewer(
 - 如果 browser_take_screenshot 失败，说明原因并给出 RESULT_REJECTED
 """
 
+
+@lru_cache(maxsize=None)
+def _build_result_sysmsg(rules_manager: RulesManager, rules_ver: int) -> str:
+    """渲染结果审核智能体的 system_message（按规则版本缓存）。
+
+    可变的规则块在前，静态的角色块在后，规则未变时整段字节级一致。
+    """
+    rules_prompt = rules_manager.get_rules_prompt()
+    return f"{rules_prompt}\n\n{_STATIC_RESULT_SUFFIX}"
+
+
+def create_result_reviewer(
+    model_client: ChatCompletionClient,
+    figma_tools: list,
+    browser_tools: list,
+    image_compare_tools: list,
+    file_tools: list,
+    rules_manager: RulesManager,
+) -> AssistantAgent:
+    """创建结果审核智能体。
+
+    Args:
+        model_client: LLM 客户端
+        figma_tools: Figma MCP 工具列表
+        browser_tools: Playwright Browser MCP 工具列表
+        image_compare_tools: 截图对比工具列表
+        file_tools: 文件/图片保存工具列表
+        rules_manager: 规则管理器实例
+
+    Returns:
+        配置好的 AssistantAgent
+    """
+    # system_message 按 (管理器实例, 规则版本) 缓存，重复构建时直接复用
+    system_message = _build_result_sysmsg(rules_manager, rules_manager.version)
+
     return AssistantAgent(
         name="result_reviewer",
         description=(
@@ -0,0 +1,106 @@
+"""
+确定性 LLM 响应缓存
+
+仅在采样温度为 0（确定性输出）时启用：相同的 (模型, 消息, 工具) 组合
+必然产生相同回复，命中时直接复用上次结果，省去一次完整的 LLM 往返。
+
+两级结构：
+  - 进程内 LRU（OrderedDict）— 同一会话内的重复调用零 I/O
+  - 磁盘 JSON 文件（每键一个文件）— 跨进程 / 重启后复用
+
+磁盘条目按 TTL 过期，超过容量上限时按 mtime 淘汰最旧的条目。
+键的计算由调用方负责（见 config/model_client.py），本模块只做字符串
+载荷的存取。
+"""
+import os
+import time
+from collections import OrderedDict
+from typing import Optional
+
+# 磁盘条目的默认存活时间（24 小时）
+_DEFAULT_TTL_SECONDS = 24 * 3600
+
+
+class LLMCache:
+    """按键存取字符串载荷的两级缓存（内存 LRU + 磁盘文件）。"""
+
+    def __init__(
+        self,
+        cache_dir: str,
+        ttl_seconds: float = _DEFAULT_TTL_SECONDS,
+        max_entries: int = 256,
+        memory_entries: int = 64,
+    ) -> None:
+        self._cache_dir = cache_dir
+        self._ttl_seconds = ttl_seconds
+        self._max_entries = max_entries
+        self._memory_entries = memory_entries
+        self._memory: OrderedDict[str, str] = OrderedDict()
+        # 命中 / 未命中计数（可观测性统计，供运行结束后上报）
+        self.hits: int = 0
+        self.misses: int = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self._cache_dir, f"{key}.json")
+
+    # ------------------------------------------------------------------
+    # 读取
+    # ------------------------------------------------------------------
+
+    def get(self, key: str) -> Optional[str]:
+        """按键读取载荷；过期或不存在时返回 None。"""
+        payload = self._memory.get(key)
+        if payload is not None:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return payload
+
+        path = self._path(key)
+        try:
+            if time.time() - os.stat(path).st_mtime > self._ttl_seconds:
+                os.remove(path)
+                self.misses += 1
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                payload = f.read()
+        except OSError:
+            self.misses += 1
+            return None
+
+        self._remember(key, payload)
+        self.hits += 1
+        return payload
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+
+    def set(self, key: str, payload: str) -> None:
+        """按键写入载荷（内存 + 磁盘），必要时淘汰最旧的磁盘条目。"""
+        self._remember(key, payload)
+        with open(self._path(key), "w", encoding="utf-8") as f:
+            f.write(payload)
+        self._evict_disk()
+
+    def _remember(self, key: str, payload: str) -> None:
+        self._memory[key] = payload
+        self._memory.move_to_end(key)
+        while len(self._memory) > self._memory_entries:
+            self._memory.popitem(last=False)
+
+    def _evict_disk(self) -> None:
+        try:
+            entries = [
+                e for e in os.scandir(self._cache_dir) if e.name.endswith(".json")
+            ]
+        except OSError:
+            return
+        if len(entries) <= self._max_entries:
+            return
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        for entry in entries[: len(entries) - self._max_entries]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
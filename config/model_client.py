@@ -5,6 +5,8 @@
 所有模型均限流时等待一段时间后重试。
 """
 import asyncio
+import hashlib
+import json
 import time
 from typing import Any, AsyncGenerator, Callable, Literal, Mapping, Optional, Sequence, Union
 
@@ -17,12 +19,81 @@ from autogen_core.models import (
     LLMMessage,
     ModelInfo,
     RequestUsage,
+    SystemMessage,
 )
 from autogen_core.tools import Tool, ToolSchema
 from autogen_ext.models.openai import OpenAIChatCompletionClient
 
+from cache.llm_cache import LLMCache
 from config import settings
 
+# 已知的限流异常类型 — isinstance 检查优先于字符串匹配，
+# 避免突发 429 时对每个异常做 str(error) 分配
+try:
+    from openai import RateLimitError as _OpenAIRateLimitError
+
+    _RATE_LIMIT_TYPES: tuple[type[Exception], ...] = (_OpenAIRateLimitError,)
+except ImportError:  # pragma: no cover - openai 随 autogen-ext 一同安装
+    _RATE_LIMIT_TYPES = ()
+
+
+# ============================================================
+# Prompt cache key 计算
+# ============================================================
+
+# provider 端 prompt cache 通常要求前缀 >= 1024 token 才生效，
+# 这里用字符数近似（中文约 1 字符 ≈ 1 token）
+_PROMPT_CACHE_MIN_CHARS = 1024
+
+
+def _tool_schema_fingerprint(tools: Sequence[Tool | ToolSchema]) -> str:
+    """将工具 schema 确定性序列化，保证跨进程 hash 一致。"""
+    schemas = [t.schema if isinstance(t, Tool) else t for t in tools]
+    return json.dumps(schemas, ensure_ascii=False, sort_keys=True, default=str)
+
+
+def _prompt_cache_key(
+    messages: Sequence[LLMMessage],
+    tools: Sequence[Tool | ToolSchema],
+) -> Optional[str]:
+    """为稳定的 system prompt 前缀计算缓存键。
+
+    仅当首条消息是足够长的 SystemMessage 时返回键（短前缀命中不了
+    provider 端缓存，不值得额外传参）。键同时覆盖工具 schema，
+    避免工具集变化后复用过期前缀。
+    """
+    if not messages or not isinstance(messages[0], SystemMessage):
+        return None
+    system_text = messages[0].content
+    if not isinstance(system_text, str) or len(system_text) < _PROMPT_CACHE_MIN_CHARS:
+        return None
+    digest = hashlib.sha256()
+    digest.update(system_text.encode("utf-8"))
+    if tools:
+        digest.update(_tool_schema_fingerprint(tools).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _response_cache_key(
+    model: str,
+    messages: Sequence[LLMMessage],
+    tools: Sequence[Tool | ToolSchema],
+) -> str:
+    """为一次确定性调用计算响应缓存键（覆盖模型、完整消息和工具集）。"""
+    digest = hashlib.sha256()
+    digest.update(model.encode("utf-8"))
+    digest.update(
+        json.dumps(
+            [m.model_dump() for m in messages],
+            ensure_ascii=False,
+            sort_keys=True,
+            default=str,
+        ).encode("utf-8")
+    )
+    if tools:
+        digest.update(_tool_schema_fingerprint(tools).encode("utf-8"))
+    return digest.hexdigest()
+
 
 # ============================================================
 # 多模型回退包装器
@@ -44,27 +115,80 @@ class FallbackChatCompletionClient(ChatCompletionClient):
     component_config_schema = BaseModel
     component_provider_override = None
 
+    # 实例属性固定为以下集合，走 slot 描述符访问而非 __dict__ 查找。
+    # 基类（ComponentLoader）未声明 __slots__，实例仍带一个空 __dict__，
+    # 但所有已声明属性的读写都命中描述符快路径
+    __slots__ = (
+        "_client_factories",
+        "_clients",
+        "_model_names",
+        "_cooldown_seconds",
+        "_retry_wait_seconds",
+        "_hedge_after_seconds",
+        "_on_token",
+        "_hedge_wasted_tokens",
+        "_batch_semaphore",
+        "_current_index",
+        "_cooldowns",
+        "_total_prompt_tokens",
+        "_total_completion_tokens",
+        "_sysmsg_token_cache",
+        "_response_cache",
+    )
+
     def __init__(
         self,
-        clients: list[OpenAIChatCompletionClient],
+        client_factories: list[Callable[[], OpenAIChatCompletionClient]],
         model_names: list[str],
         cooldown_seconds: float = 60,
         retry_wait_seconds: float = 10,
+        hedge_after_seconds: float = 0.8,
+        max_concurrency: int = 4,
         on_token: Optional[Callable[[str], None]] = None,
+        response_cache: Optional[LLMCache] = None,
     ) -> None:
-        if not clients:
+        if not client_factories:
             raise ValueError("至少需要一个模型客户端")
 
-        self._clients = clients
+        # 客户端按需实例化 — 备选模型未被用到时不创建 httpx 连接池和分词器
+        self._client_factories = client_factories
+        self._clients: dict[int, OpenAIChatCompletionClient] = {}
         self._model_names = model_names
         self._cooldown_seconds = cooldown_seconds
         self._retry_wait_seconds = retry_wait_seconds
+        # 主候选超过该时长未返回时，并发启动下一个候选（对冲请求）
+        self._hedge_after_seconds = hedge_after_seconds
         self._on_token = on_token
+        # 对冲请求中被弃用但已计费的 token（可观测性统计）
+        self._hedge_wasted_tokens: int = 0
+        # create_batch 的并发上限（避免并发批量请求触发限流）
+        self._batch_semaphore = asyncio.Semaphore(max_concurrency)
 
-        # 当前优先使用的模型索引
+        # 当前优先使用的模型索引（供 create_stream / count_tokens 等委托方法使用）
         self._current_index: int = 0
-        # 被限流的模型 → 冷却截止时间戳
-        self._cooldowns: dict[int, float] = {}
+        # 各模型的冷却截止时间戳，按模型索引定位 — 纯下标读写，
+        # 无需字典哈希或堆调整，冷却过期由时间比较隐式处理
+        self._cooldowns: list[float] = [0.0] * len(client_factories)
+
+        # 用量累计 — 在成功返回时增量累加，
+        # 避免 actual_usage/total_usage 每次遍历所有子客户端
+        self._total_prompt_tokens: int = 0
+        self._total_completion_tokens: int = 0
+
+        # (模型索引, system 内容摘要) → token 数。
+        # system prompt 会话期间基本不变，缓存后 count_tokens 只需分词增量部分
+        self._sysmsg_token_cache: dict[tuple[int, bytes], int] = {}
+
+        # 确定性响应缓存（仅温度为 0 时由工厂注入，None 表示关闭）
+        self._response_cache = response_cache
+
+    def _get_client(self, idx: int) -> OpenAIChatCompletionClient:
+        """返回指定模型的客户端，首次使用时才实例化。"""
+        client = self._clients.get(idx)
+        if client is None:
+            client = self._client_factories[idx]()
+            self._clients[idx] = client
+        return client
 
     # ------------------------------------------------------------------
     # 核心方法：create（带回退逻辑）
@@ -81,19 +205,35 @@ class FallbackChatCompletionClient(ChatCompletionClient):
         cancellation_token: Optional[CancellationToken] = None,
     ) -> CreateResult:
         """调用 LLM 生成回复，429 时自动切换模型。"""
-        last_error: Optional[Exception] = None
-        now = time.time()
+        # 确定性调用先查响应缓存 — 命中时完全跳过 LLM 往返
+        response_key: Optional[str] = None
+        if self._response_cache is not None:
+            response_key = _response_cache_key(self._model_names[0], messages, tools)
+            cached_payload = self._response_cache.get(response_key)
+            if cached_payload is not None:
+                return CreateResult.model_validate_json(cached_payload).model_copy(
+                    update={"cached": True}
+                )
 
-        # 第一轮：按顺序尝试所有未冷却的模型
-        for i in range(len(self._clients)):
-            idx = (self._current_index + i) % len(self._clients)
+        # 稳定的 system 前缀带上 prompt_cache_key，让 provider 复用前缀 KV
+        cache_key = _prompt_cache_key(messages, tools)
+        if cache_key is not None and "prompt_cache_key" not in extra_create_args:
+            extra_create_args = {**extra_create_args, "prompt_cache_key": cache_key}
 
-            # 跳过仍在冷却期的模型
-            if idx in self._cooldowns and self._cooldowns[idx] > now:
-                continue
+        last_error: Optional[Exception] = None
+        now = time.time()
 
-            try:
-                result = await self._clients[idx].create(
+        # 第一轮：快照所有已就绪（冷却到期）的模型，按回退链顺序尝试。
+        # 只读快照不改动冷却状态，并发的 create() 调用（如 create_batch）互不干扰。
+        # 主候选超过 hedge_after_seconds 未返回时并发启动下一个候选（对冲），
+        # 先返回者获胜，其余任务取消。
+        candidates: list[int] = [
+            idx for idx, until in enumerate(self._cooldowns) if until <= now
+        ]
+
+        def _attempt(idx: int) -> "asyncio.Task[CreateResult]":
+            return asyncio.ensure_future(
+                self._get_client(idx).create(
                     messages,
                     tools=tools,
                     tool_choice=tool_choice,
@@ -101,30 +241,82 @@ class FallbackChatCompletionClient(ChatCompletionClient):
                     extra_create_args=extra_create_args,
                     cancellation_token=cancellation_token,
                 )
-                # 成功 → 记住这个模型
-                self._current_index = idx
-                return result
+            )
 
-            except Exception as e:
-                if self._is_rate_limit_error(e):
-                    name = self._model_names[idx]
-                    print(f"[模型切换] {name} 请求受限 (429)，冷却 {self._cooldown_seconds}s")
-                    self._cooldowns[idx] = now + self._cooldown_seconds
-                    last_error = e
+        in_flight: dict["asyncio.Task[CreateResult]", int] = {}
+        next_pos = 0
+        result: Optional[CreateResult] = None
+        winner_idx: Optional[int] = None
+
+        def _cancel_in_flight() -> None:
+            for task in in_flight:
+                task.cancel()
+            in_flight.clear()
+
+        while result is None and (in_flight or next_pos < len(candidates)):
+            if not in_flight:
+                idx = candidates[next_pos]
+                next_pos += 1
+                in_flight[_attempt(idx)] = idx
+
+            # 仅有一个在途任务且还有候选时限时等待，超时则启动对冲
+            hedge_possible = len(in_flight) == 1 and next_pos < len(candidates)
+            done, _pending = await asyncio.wait(
+                set(in_flight),
+                timeout=self._hedge_after_seconds if hedge_possible else None,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if not done:
+                idx = candidates[next_pos]
+                next_pos += 1
+                in_flight[_attempt(idx)] = idx
+                continue
+
+            for task in done:
+                idx = in_flight.pop(task)
+                try:
+                    r = task.result()
+                except asyncio.CancelledError:
                     continue
-                # 非限流错误直接抛出
-                raise
+                except Exception as e:
+                    if self._is_rate_limit_error(e):
+                        name = self._model_names[idx]
+                        print(f"[模型切换] {name} 请求受限 (429)，冷却 {self._cooldown_seconds}s")
+                        self._cooldowns[idx] = now + self._cooldown_seconds
+                        last_error = e
+                        continue
+                    # 非限流错误：取消在途的对冲任务后直接抛出
+                    _cancel_in_flight()
+                    raise
+                else:
+                    if result is None:
+                        result = r
+                        winner_idx = idx
+                    elif r.usage is not None:
+                        # 同时完成的对冲请求 — 结果弃用，token 已计费
+                        self._hedge_wasted_tokens += (
+                            r.usage.prompt_tokens + r.usage.completion_tokens
+                        )
+
+        if result is not None:
+            # 成功 → 记住获胜模型，取消未完成的对冲任务
+            _cancel_in_flight()
+            self._current_index = winner_idx
+            self._record_usage(result)
+            if response_key is not None:
+                self._response_cache.set(response_key, result.model_dump_json())
+            return result
 
         # 第二轮：所有模型均限流 → 等待后清除冷却、重试第一个
         if last_error is not None:
             print(
-                f"[模型切换] 所有 {len(self._clients)} 个模型均受限，"
+                f"[模型切换] 所有 {len(self._client_factories)} 个模型均受限，"
                 f"等待 {self._retry_wait_seconds}s 后重试..."
             )
             await asyncio.sleep(self._retry_wait_seconds)
-            self._cooldowns.clear()
+            self._cooldowns = [0.0] * len(self._client_factories)
             self._current_index = 0
-            return await self._clients[0].create(
+            result = await self._get_client(0).create(
                 messages,
                 tools=tools,
                 tool_choice=tool_choice,
@@ -132,9 +324,46 @@ class FallbackChatCompletionClient(ChatCompletionClient):
                 extra_create_args=extra_create_args,
                 cancellation_token=cancellation_token,
             )
+            self._record_usage(result)
+            if response_key is not None:
+                self._response_cache.set(response_key, result.model_dump_json())
+            return result
 
         raise RuntimeError("没有可用的模型客户端")
 
+    # ------------------------------------------------------------------
+    # create_batch：并发执行多组独立请求
+    # ------------------------------------------------------------------
+
+    async def create_batch(
+        self,
+        batch_messages: Sequence[Sequence[LLMMessage]],
+        *,
+        tools: Sequence[Tool | ToolSchema] = [],
+        tool_choice: Tool | Literal["auto", "required", "none"] = "auto",
+        json_output: Optional[bool | type[BaseModel]] = None,
+        extra_create_args: Mapping[str, Any] = {},
+        cancellation_token: Optional[CancellationToken] = None,
+    ) -> list[CreateResult]:
+        """并发执行一批互相独立的请求，返回与输入同序的结果列表。
+
+        每个请求各自走 create() 的回退 / 对冲逻辑，
+        并发度由 max_concurrency 限制以免触发限流。
+        """
+
+        async def _one(msgs: Sequence[LLMMessage]) -> CreateResult:
+            async with self._batch_semaphore:
+                return await self.create(
+                    msgs,
+                    tools=tools,
+                    tool_choice=tool_choice,
+                    json_output=json_output,
+                    extra_create_args=extra_create_args,
+                    cancellation_token=cancellation_token,
+                )
+
+        return list(await asyncio.gather(*(_one(m) for m in batch_messages)))
+
     # ------------------------------------------------------------------
     # create_stream（带回退逻辑）
     # ------------------------------------------------------------------
@@ -149,8 +378,58 @@ class FallbackChatCompletionClient(ChatCompletionClient):
         extra_create_args: Mapping[str, Any] = {},
         cancellation_token: Optional[CancellationToken] = None,
     ) -> AsyncGenerator[Union[str, CreateResult], None]:
-        """流式调用当前活跃模型，拦截 token chunk 并通过回调通知。"""
-        stream = self._clients[self._current_index].create_stream(
+        """流式调用 LLM，拦截 token chunk 并通过回调通知。
+
+        回退策略与 create() 一致，但只允许在 **首个 chunk 产出之前** 切换模型：
+        一旦开始向调用方吐出内容，切换会导致拼接两个模型的输出，
+        此时 429 直接向上抛出。
+        """
+        cache_key = _prompt_cache_key(messages, tools)
+        if cache_key is not None and "prompt_cache_key" not in extra_create_args:
+            extra_create_args = {**extra_create_args, "prompt_cache_key": cache_key}
+
+        last_error: Optional[Exception] = None
+        now = time.time()
+        candidates = [idx for idx, until in enumerate(self._cooldowns) if until <= now]
+
+        for idx in candidates:
+            chunk_yielded = False
+            try:
+                stream = self._get_client(idx).create_stream(
+                    messages,
+                    tools=tools,
+                    tool_choice=tool_choice,
+                    json_output=json_output,
+                    extra_create_args=extra_create_args,
+                    cancellation_token=cancellation_token,
+                )
+                async for chunk in stream:
+                    if not chunk_yielded:
+                        chunk_yielded = True
+                        self._current_index = idx
+                    self._handle_stream_chunk(chunk)
+                    yield chunk
+                return
+            except Exception as e:
+                # 已向调用方吐出内容后不可切换；非限流错误也直接抛出
+                if chunk_yielded or not self._is_rate_limit_error(e):
+                    raise
+                name = self._model_names[idx]
+                print(f"[模型切换] {name} 流式请求受限 (429)，冷却 {self._cooldown_seconds}s")
+                self._cooldowns[idx] = now + self._cooldown_seconds
+                last_error = e
+
+        # 所有模型均限流 → 等待后清除冷却、从第一个重试（与 create 同策略）
+        if last_error is None:
+            raise RuntimeError("没有可用的模型客户端")
+        print(
+            f"[模型切换] 所有 {len(self._client_factories)} 个模型均受限，"
+            f"等待 {self._retry_wait_seconds}s 后重试..."
+        )
+        await asyncio.sleep(self._retry_wait_seconds)
+        self._cooldowns = [0.0] * len(self._client_factories)
+        self._current_index = 0
+        stream = self._get_client(0).create_stream(
             messages,
             tools=tools,
             tool_choice=tool_choice,
@@ -159,14 +438,20 @@ class FallbackChatCompletionClient(ChatCompletionClient):
             cancellation_token=cancellation_token,
         )
         async for chunk in stream:
-            # str chunk 是单个 token，CreateResult 是最终结果
-            if isinstance(chunk, str) and self._on_token:
-                try:
-                    self._on_token(chunk)
-                except Exception:
-                    pass  # 回调异常不应中断生成
+            self._handle_stream_chunk(chunk)
             yield chunk
 
+    def _handle_stream_chunk(self, chunk: Union[str, CreateResult]) -> None:
+        """处理单个流式 chunk：token 回调通知，最终结果累计用量。"""
+        # str chunk 是单个 token，CreateResult 是最终结果
+        if isinstance(chunk, str) and self._on_token:
+            try:
+                self._on_token(chunk)
+            except Exception:
+                pass  # 回调异常不应中断生成
+        elif isinstance(chunk, CreateResult):
+            self._record_usage(chunk)
+
     # ------------------------------------------------------------------
     # 委托方法：转发到当前活跃客户端
     # ------------------------------------------------------------------
@@ -177,7 +462,19 @@ class FallbackChatCompletionClient(ChatCompletionClient):
         *,
         tools: Sequence[Tool | ToolSchema] = [],
     ) -> int:
-        return self._clients[self._current_index].count_tokens(messages, tools=tools)
+        idx = self._current_index
+        client = self._get_client(idx)
+
+        # 静态 system 前缀的 token 数按内容摘要缓存，只重新分词后续消息
+        if messages and isinstance(messages[0], SystemMessage) and isinstance(messages[0].content, str):
+            key = (idx, hashlib.md5(messages[0].content.encode("utf-8")).digest())
+            system_tokens = self._sysmsg_token_cache.get(key)
+            if system_tokens is None:
+                system_tokens = client.count_tokens([messages[0]])
+                self._sysmsg_token_cache[key] = system_tokens
+            return system_tokens + client.count_tokens(messages[1:], tools=tools)
+
+        return client.count_tokens(messages, tools=tools)
 
     def remaining_tokens(
         self,
@@ -185,43 +482,41 @@ class FallbackChatCompletionClient(ChatCompletionClient):
         *,
         tools: Sequence[Tool | ToolSchema] = [],
     ) -> int:
-        return self._clients[self._current_index].remaining_tokens(messages, tools=tools)
+        return self._get_client(self._current_index).remaining_tokens(messages, tools=tools)
 
     def remaining_budget(self) -> float:
-        return self._clients[self._current_index].remaining_budget()
+        return self._get_client(self._current_index).remaining_budget()
 
     @property
     def capabilities(self) -> Any:
-        return self._clients[self._current_index].capabilities
+        return self._get_client(self._current_index).capabilities
 
     @property
     def model_info(self) -> ModelInfo:
-        return self._clients[self._current_index].model_info
+        return self._get_client(self._current_index).model_info
+
+    def _record_usage(self, result: CreateResult) -> None:
+        """增量累加一次成功调用的 token 用量（asyncio 单线程，无需加锁）。"""
+        usage = result.usage
+        if usage is not None:
+            self._total_prompt_tokens += usage.prompt_tokens
+            self._total_completion_tokens += usage.completion_tokens
 
     def actual_usage(self) -> RequestUsage:
-        # 汇总所有客户端的用量
-        total = RequestUsage(prompt_tokens=0, completion_tokens=0)
-        for client in self._clients:
-            usage = client.actual_usage()
-            total = RequestUsage(
-                prompt_tokens=total.prompt_tokens + usage.prompt_tokens,
-                completion_tokens=total.completion_tokens + usage.completion_tokens,
-            )
-        return total
+        return RequestUsage(
+            prompt_tokens=self._total_prompt_tokens,
+            completion_tokens=self._total_completion_tokens,
+        )
 
     def total_usage(self) -> RequestUsage:
-        total = RequestUsage(prompt_tokens=0, completion_tokens=0)
-        for client in self._clients:
-            usage = client.total_usage()
-            total = RequestUsage(
-                prompt_tokens=total.prompt_tokens + usage.prompt_tokens,
-                completion_tokens=total.completion_tokens + usage.completion_tokens,
-            )
-        return total
+        return RequestUsage(
+            prompt_tokens=self._total_prompt_tokens,
+            completion_tokens=self._total_completion_tokens,
+        )
 
     async def close(self) -> None:
         """关闭所有底层客户端。"""
-        for client in self._clients:
+        for client in self._clients.values():
             await client.close()
 
     # ------------------------------------------------------------------
@@ -242,25 +537,41 @@ class FallbackChatCompletionClient(ChatCompletionClient):
     @staticmethod
     def _is_rate_limit_error(error: Exception) -> bool:
         """判断异常是否为 429 限流错误。"""
-        # openai.RateLimitError
+        # 快路径：已知异常类型 / 带 429 状态码的异常
+        if _RATE_LIMIT_TYPES and isinstance(error, _RATE_LIMIT_TYPES):
+            return True
+        if getattr(error, "status_code", None) == 429:
+            return True
+        # 兜底：未知异常类型才检查类名和错误信息
         error_type = type(error).__name__
         if "RateLimitError" in error_type:
             return True
-        # 兜底：检查错误信息
         error_str = str(error).lower()
         return "429" in error_str or "rate limit" in error_str
 
     def get_status(self) -> str:
         """返回当前模型切换状态（调试用）。"""
+        # 快路径：从未触发过冷却时跳过逐模型格式化（状态打印常出现在
+        # 限流重试的热路径上，不值得每次分配多行字符串）
+        if not any(self._cooldowns):
+            idx = self._current_index
+            return f"模型状态: 全部可用，当前 [{idx}] {self._model_names[idx]}"
+
         now = time.time()
-        lines = ["模型状态:"]
-        for i, name in enumerate(self._model_names):
-            status = "✓ 活跃" if i == self._current_index else "  待命"
-            if i in self._cooldowns and self._cooldowns[i] > now:
+
+        def _line(i: int, name: str) -> str:
+            if self._cooldowns[i] > now:
                 remaining = int(self._cooldowns[i] - now)
                 status = f"✗ 冷却中 ({remaining}s)"
-            lines.append(f"  [{i}] {name} — {status}")
-        return "\n".join(lines)
+            elif i == self._current_index:
+                status = "✓ 活跃"
+            else:
+                status = "  待命"
+            return f"  [{i}] {name} — {status}"
+
+        return "\n".join(
+            ("模型状态:", *(_line(i, name) for i, name in enumerate(self._model_names)))
+        )
 
 
 # ============================================================
@@ -270,44 +581,50 @@ class FallbackChatCompletionClient(ChatCompletionClient):
 
 def create_model_client(
     on_token: Optional[Callable[[str], None]] = None,
+    response_cache: Optional[LLMCache] = None,
 ) -> FallbackChatCompletionClient:
     """根据 MODEL_FALLBACK_CHAIN 配置创建带自动回退的模型客户端。
 
     Args:
         on_token: 可选回调，每生成一个 token 时调用，用于流式推送到前端。
+        response_cache: 可选的确定性响应缓存（仅温度为 0 时传入才有意义）。
 
     Returns:
         FallbackChatCompletionClient 实例（兼容 ChatCompletionClient 接口）
     """
-    clients: list[OpenAIChatCompletionClient] = []
-    model_names: list[str] = []
-
-    for cfg in settings.MODEL_FALLBACK_CHAIN:
-        client = OpenAIChatCompletionClient(
-            model=cfg["model"],
-            base_url=cfg["base_url"],
-            api_key=cfg["api_key"],
-            temperature=settings.MODEL_TEMPERATURE,
-            model_info={
-                "vision": cfg.get("vision", False),
-                "function_calling": cfg.get("function_calling", True),
-                "json_output": cfg.get("json_output", True),
-                "structured_output": cfg.get("structured_output", False),
-                "family": cfg.get("family", "unknown"),
-            },
-        )
-        clients.append(client)
-        model_names.append(cfg["model"])
+    def _make_factory(cfg: dict) -> Callable[[], OpenAIChatCompletionClient]:
+        def _factory() -> OpenAIChatCompletionClient:
+            return OpenAIChatCompletionClient(
+                model=cfg["model"],
+                base_url=cfg["base_url"],
+                api_key=cfg["api_key"],
+                temperature=settings.MODEL_TEMPERATURE,
+                model_info={
+                    "vision": cfg.get("vision", False),
+                    "function_calling": cfg.get("function_calling", True),
+                    "json_output": cfg.get("json_output", True),
+                    "structured_output": cfg.get("structured_output", False),
+                    "family": cfg.get("family", "unknown"),
+                },
+            )
+
+        return _factory
+
+    # 只注册工厂，客户端在首次真正使用时才实例化
+    client_factories = [_make_factory(cfg) for cfg in settings.MODEL_FALLBACK_CHAIN]
+    model_names = [cfg["model"] for cfg in settings.MODEL_FALLBACK_CHAIN]
 
-    print(f"[模型] 已加载 {len(clients)} 个备选模型:")
+    print(f"[模型] 已注册 {len(client_factories)} 个备选模型:")
     for i, name in enumerate(model_names):
         marker = "→" if i == 0 else " "
         print(f"  {marker} [{i}] {name}")
 
     return FallbackChatCompletionClient(
-        clients=clients,
+        client_factories=client_factories,
         model_names=model_names,
         cooldown_seconds=settings.MODEL_COOLDOWN_SECONDS,
         retry_wait_seconds=settings.MODEL_RETRY_WAIT_SECONDS,
+        hedge_after_seconds=settings.MODEL_HEDGE_AFTER_SECONDS,
         on_token=on_token,
+        response_cache=response_cache,
     )
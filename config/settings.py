@@ -68,6 +68,9 @@ MODEL_COOLDOWN_SECONDS = 60
 # 所有模型均限流时的等待重试时间（秒）
 MODEL_RETRY_WAIT_SECONDS = 10
 
+# 主模型超过该时长未返回时，并发尝试下一个备选模型（对冲请求，秒）
+MODEL_HEDGE_AFTER_SECONDS = 0.8
+
 # ============================================================
 # Figma 配置
 # ============================================================
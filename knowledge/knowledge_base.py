@@ -3,10 +3,29 @@
 
 使用 JSON 文件存储，按分类索引（css_classes / layout_patterns / coding_tips）。
 提供 search / add_entry / get_by_category 等方法，供智能体通过工具函数调用。
+
+写入采用 WAL（append-only JSONL）模式：add_entry 只追加一行，
+积累到一定条数后才重写完整 JSON 快照，避免每次写入都全量序列化。
 """
+import hashlib
 import json
 import os
-from typing import Any, Dict, List
+import re
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+# orjson（C 实现）序列化大型嵌套结构比 stdlib json 快 3-5 倍；
+# 未安装时退回 stdlib
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 词元模式 — \w 含中文等 Unicode 词字符；纯词元关键词的子串匹配
+# 不可能跨越非词字符边界，因此词元级索引与全文子串扫描结果一致
+_TOKEN_RE = re.compile(r"[\w\-]+")
+
+# WAL 积累到该条数后重写完整快照并清空 WAL
+_COMPACT_EVERY = 50
 
 
 class KnowledgeBase:
@@ -18,6 +37,31 @@ class KnowledgeBase:
     def __init__(self, data: Dict[str, List[Any]], file_path: str) -> None:
         self._data = data
         self._file_path = file_path
+        # (分类, 条目, 小写序列化文本) 缓存 — 每条只序列化一次
+        self._lower_cache: List[Tuple[str, Dict[str, Any], str]] = [
+            (category, entry, json.dumps(entry, ensure_ascii=False).lower())
+            for category, entries in data.items()
+            for entry in entries
+        ]
+        # 词元 → 条目位置 的倒排索引，首次搜索时惰性构建
+        self._index: Optional[Dict[str, Set[int]]] = None
+        # WAL 追加句柄（惰性打开，行缓冲）和未快照的追加条数
+        self._wal = None
+        self._wal_count: int = 0
+        # get_all_as_text 的确定性缓存及其内容摘要
+        self._cached_text: Optional[str] = None
+        self._cached_digest: Optional[str] = None
+
+    @property
+    def _wal_path(self) -> str:
+        return self._file_path + ".jsonl"
+
+    def _build_index(self) -> Dict[str, Set[int]]:
+        index: Dict[str, Set[int]] = {}
+        for pos, (_category, _entry, text) in enumerate(self._lower_cache):
+            for token in _TOKEN_RE.findall(text):
+                index.setdefault(token, set()).add(pos)
+        return index
 
     # ------------------------------------------------------------------
     # 持久化
@@ -25,19 +69,55 @@ class KnowledgeBase:
 
     @classmethod
     def load(cls, file_path: str) -> "KnowledgeBase":
-        """从 JSON 文件加载知识库；若文件不存在则创建空库。"""
+        """从 JSON 快照加载知识库并重放 WAL 尾部；文件不存在则创建空库。"""
         if os.path.exists(file_path):
-            with open(file_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
+            if orjson is not None:
+                with open(file_path, "rb") as f:
+                    data = orjson.loads(f.read())
+            else:
+                with open(file_path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
         else:
             data = {cat: [] for cat in cls.DEFAULT_CATEGORIES}
-        return cls(data, file_path)
+
+        # 重放快照之后追加的 WAL 记录
+        wal_count = 0
+        wal_path = file_path + ".jsonl"
+        if os.path.exists(wal_path):
+            with open(wal_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    record = json.loads(line)
+                    data.setdefault(record["cat"], []).append(record["entry"])
+                    wal_count += 1
+
+        kb = cls(data, file_path)
+        kb._wal_count = wal_count
+        return kb
 
     def save(self) -> None:
-        """将知识库持久化到 JSON 文件。"""
+        """将完整快照持久化到 JSON 文件，并清空已合并的 WAL。"""
         os.makedirs(os.path.dirname(self._file_path), exist_ok=True)
-        with open(self._file_path, "w", encoding="utf-8") as f:
-            json.dump(self._data, f, ensure_ascii=False, indent=2)
+        if orjson is not None:
+            with open(self._file_path, "wb") as f:
+                f.write(orjson.dumps(self._data, option=orjson.OPT_INDENT_2))
+        else:
+            with open(self._file_path, "w", encoding="utf-8") as f:
+                json.dump(self._data, f, ensure_ascii=False, indent=2)
+        # 快照已包含全部条目 → 截断 WAL
+        if self._wal is not None:
+            self._wal.close()
+            self._wal = None
+        open(self._wal_path, "w", encoding="utf-8").close()
+        self._wal_count = 0
+
+    def close(self) -> None:
+        """关闭 WAL 句柄（已写入的记录保持落盘）。"""
+        if self._wal is not None:
+            self._wal.close()
+            self._wal = None
 
     # ------------------------------------------------------------------
     # 查询
@@ -45,27 +125,59 @@ class KnowledgeBase:
 
     def search(self, keyword: str) -> List[Dict[str, Any]]:
         """按关键词搜索所有分类，返回匹配的条目列表。"""
-        results: List[Dict[str, Any]] = []
         keyword_lower = keyword.lower()
-        for category, entries in self._data.items():
-            for entry in entries:
-                entry_str = json.dumps(entry, ensure_ascii=False).lower()
-                if keyword_lower in entry_str:
-                    results.append({"category": category, **entry})
-        return results
+
+        # 快路径：纯词元关键词走倒排索引 — 只扫描词表而非所有条目文本
+        if _TOKEN_RE.fullmatch(keyword_lower):
+            if self._index is None:
+                self._index = self._build_index()
+            positions: Set[int] = set()
+            for token, hits in self._index.items():
+                if keyword_lower in token:
+                    positions |= hits
+            return [
+                {"category": self._lower_cache[pos][0], **self._lower_cache[pos][1]}
+                for pos in sorted(positions)
+            ]
+
+        # 兜底：含分隔符的关键词对缓存文本做子串扫描
+        return [
+            {"category": category, **entry}
+            for category, entry, text in self._lower_cache
+            if keyword_lower in text
+        ]
 
     def get_by_category(self, category: str) -> List[Dict[str, Any]]:
         """按分类获取所有条目。"""
         return self._data.get(category, [])
 
     def get_all_as_text(self) -> str:
-        """将整个知识库格式化为可阅读文本（供嵌入 prompt）。"""
-        lines: List[str] = []
-        for category, entries in self._data.items():
-            lines.append(f"\n## {category}")
-            for entry in entries:
-                lines.append(json.dumps(entry, ensure_ascii=False))
-        return "\n".join(lines)
+        """将整个知识库格式化为可阅读文本（供嵌入 prompt）。
+
+        输出按分类名和条目内容排序并缓存，与条目插入顺序无关 —
+        同样的知识库跨进程产生字节级一致的文本，上游 prompt cache 才能命中。
+        """
+        if self._cached_text is None:
+            lines: List[str] = []
+            for category in sorted(self._data):
+                lines.append(f"\n## {category}")
+                serialized = sorted(
+                    json.dumps(entry, ensure_ascii=False, sort_keys=True)
+                    for entry in self._data[category]
+                )
+                lines.extend(serialized)
+            self._cached_text = "\n".join(lines)
+            self._cached_digest = hashlib.md5(
+                self._cached_text.encode("utf-8")
+            ).hexdigest()
+        return self._cached_text
+
+    @property
+    def version(self) -> str:
+        """知识库文本的内容摘要 — 可作为小后缀附在 prompt 中标识版本。"""
+        if self._cached_digest is None:
+            self.get_all_as_text()
+        return self._cached_digest
 
     # ------------------------------------------------------------------
     # 写入
@@ -76,4 +188,22 @@ class KnowledgeBase:
         if category not in self._data:
             self._data[category] = []
         self._data[category].append(content)
-        self.save()
+        # 增量更新检索缓存和倒排索引
+        text = json.dumps(content, ensure_ascii=False).lower()
+        pos = len(self._lower_cache)
+        self._lower_cache.append((category, content, text))
+        if self._index is not None:
+            for token in _TOKEN_RE.findall(text):
+                self._index.setdefault(token, set()).add(pos)
+        self._cached_text = None
+        self._cached_digest = None
+        # 追加写入 WAL；积累足够多时才重写完整快照
+        if self._wal is None:
+            os.makedirs(os.path.dirname(self._file_path), exist_ok=True)
+            self._wal = open(self._wal_path, "a", encoding="utf-8", buffering=1)
+        self._wal.write(
+            json.dumps({"cat": category, "entry": content}, ensure_ascii=False) + "\n"
+        )
+        self._wal_count += 1
+        if self._wal_count >= _COMPACT_EVERY:
+            self.save()
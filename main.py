@@ -13,17 +13,29 @@ Figma 设计稿转前端代码 — 多智能体工作流入口
 """
 import argparse
 import asyncio
+import contextlib
 import json
 import logging
 import sys
 import os
 from contextlib import asynccontextmanager
 
-# 将项目根目录添加到 Python 路径
-sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-
 from config import settings
 
+# uvloop（libuv 实现的事件循环）对 I/O 密集负载（WebSocket 推送、
+# MCP stdio 子进程、模型流式请求）的调度开销显著低于默认 asyncio 循环。
+# 仅限 POSIX，Windows / 未安装时退回默认循环
+try:
+    import uvloop
+except ImportError:  # pragma: no cover - Windows 或未安装
+    uvloop = None
+
+# orjson（C 实现）解析控制消息比 stdlib json 快数倍，未安装时退回 stdlib
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # ============================================================
 # 日志配置
 # ============================================================
@@ -31,7 +43,10 @@ logging.basicConfig(
     level=logging.WARNING,
     format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
 )
-logging.getLogger("autogen_core").setLevel(logging.DEBUG)
+# autogen_core 的 DEBUG 日志在每条消息 / 每次工具调用上都有格式化开销，
+# 且与 token 流式推送共用事件循环 — 仅在显式排障时打开
+if os.getenv("AUTOGEN_DEBUG") == "1":
+    logging.getLogger("autogen_core").setLevel(logging.DEBUG)
 
 
 # ============================================================
@@ -64,43 +79,85 @@ async def run_cli(args: list[str]) -> None:
         print(f"  手机端节点ID: {design_input.mobile_node_id}")
     print("=" * 60)
 
-    model_client = create_model_client()
+    # 与 Web 模式相同的确定性响应缓存：温度为 0 时，
+    # 重复的审核轮次 / 重跑同一设计稿可直接命中历史结果
+    response_cache = None
+    if settings.MODEL_TEMPERATURE == 0:
+        from cache.llm_cache import LLMCache
+
+        response_cache = LLMCache(os.path.join(settings.OUTPUT_DIR, "llm_cache"))
+
+    model_client = create_model_client(response_cache=response_cache)
     async with McpManager() as mcp_mgr:
+        # 并行预热两个 MCP 会话（Figma + Browser 子进程同时拉起）
+        await mcp_mgr.prestart()
         try:
             await run_workflow(design_input, model_client, mcp_mgr)
         except KeyboardInterrupt:
             print("\n\n[中断] 用户取消了工作流。")
         finally:
             await model_client.close()
+            from tools.file_tools import close_http_session
+
+            await close_http_session()
+            if response_cache is not None:
+                print(
+                    f"[缓存] LLM 响应: 命中 {response_cache.hits} / "
+                    f"未命中 {response_cache.misses}"
+                )
 
 
 # ============================================================
 # Web 模式
 # ============================================================
 
+# lifespan 启动时在后台线程预热的重模块（autogen / 编排器链路），
+# 磁盘读取并行进行，监听器随后的函数级导入直接命中 sys.modules
+_HEAVY_MODULES = (
+    "config.model_client",
+    "workflow.orchestrator",
+    "tools.mcp_manager",
+)
+
+
 def run_web(port: int = 8000) -> None:
     """Web 模式入口：启动 FastAPI 服务并在后台监听工作流启动请求。"""
+    import importlib
+
     import uvicorn
     from web.app import app, bridge
-    from config.model_client import create_model_client
-    from workflow.orchestrator import run_workflow_web
-    from utils.input_parser import DesignInput
-    from tools.mcp_manager import McpManager
 
     # 确保 output 目录存在
     os.makedirs(settings.OUTPUT_DIR, exist_ok=True)
 
-    # 应用级 MCP 管理器（整个服务期间复用）
-    mcp_mgr = McpManager()
+    # 应用级 MCP 管理器（整个服务期间复用），lifespan 启动时创建
+    mcp_state: dict = {}
+
+    # 温度为 0 时启用确定性响应缓存：相同的 (模型, 消息, 工具)
+    # 必然产生相同回复，重复的审核轮次可直接复用历史结果
+    response_cache = None
+    if settings.MODEL_TEMPERATURE == 0:
+        from cache.llm_cache import LLMCache
 
-    async def workflow_listener():
+        response_cache = LLMCache(os.path.join(settings.OUTPUT_DIR, "llm_cache"))
+
+    async def workflow_listener(mcp_mgr):
         """后台任务：监听 Web UI 发来的启动信号并运行工作流。"""
+        # 重模块已由 lifespan 预热，这里的导入只是 sys.modules 查找
+        from config.model_client import create_model_client
+        from workflow.orchestrator import run_workflow_web
+        from utils.input_parser import DesignInput
+
         while True:
             # 等待启动信号（从 WebSocket 的 start 消息传入）
-            raw = await bridge.input_queue.get()
+            raw = await bridge.get_input()
+            # 首字节预过滤：启动信号一定是 JSON 对象，
+            # 其他帧（用户纯文本输入等）不必进解析器
+            if not raw or raw[:1] not in ("{", b"{"):
+                continue
             try:
-                data = json.loads(raw)
-            except (json.JSONDecodeError, TypeError):
+                data = orjson.loads(raw) if orjson is not None else json.loads(raw)
+            except (ValueError, TypeError):
                 continue
 
             if not isinstance(data, dict) or "pc_link" not in data:
@@ -118,36 +175,94 @@ def run_web(port: int = 8000) -> None:
             bridge.reset_cancel()
             await bridge.emit("system", f"工作流启动: PC={pc_link}", msg_type="system")
 
-            model_client = create_model_client(on_token=bridge.emit_chunk)
+            model_client = create_model_client(
+                on_token=bridge.emit_chunk, response_cache=response_cache
+            )
             try:
-                # 将工作流包装为 task 以便取消
-                task = asyncio.create_task(
-                    run_workflow_web(design_input, model_client, mcp_mgr, bridge)
-                )
-                bridge._workflow_task = task
-                await task
-            except asyncio.CancelledError:
-                await bridge.emit("system", "工作流已被停止。", msg_type="system")
-            except Exception as e:
+                # TaskGroup 结构化并发：子任务被取消（stop 请求）时组正常退出，
+                # 监听器自身被取消（服务关闭）时 CancelledError 原样向上传播
+                async with asyncio.TaskGroup() as tg:
+                    task = tg.create_task(
+                        run_workflow_web(design_input, model_client, mcp_mgr, bridge)
+                    )
+                    bridge._workflow_task = task
+                if task.cancelled():
+                    await bridge.emit("system", "工作流已被停止。", msg_type="system")
+            except* Exception as eg:
+                e = eg.exceptions[0]
                 await bridge.emit("system", f"工作流异常: {type(e).__name__}: {e}", msg_type="error")
             finally:
                 await model_client.close()
+                if response_cache is not None:
+                    await bridge.emit(
+                        "system",
+                        f"LLM 响应缓存: 命中 {response_cache.hits} / "
+                        f"未命中 {response_cache.misses}",
+                        msg_type="system",
+                    )
                 bridge.running = False
                 bridge.waiting_for_input = False
                 bridge._workflow_task = None
                 # 通知前端工作流结束
                 await bridge._emit_status()
 
+    async def output_watcher():
+        """后台任务：用 inotify 监听 output/ 目录，推送式失效文件列表缓存。
+
+        监听在线期间 /api/files 与 list_output_files 读缓存零系统调用；
+        watchfiles 不可用时直接返回，退回 mtime + TTL 轮询。
+        """
+        try:
+            from watchfiles import awatch
+        except ImportError:
+            return
+        from tools.file_tools import invalidate_output_cache, mark_output_watched
+
+        mark_output_watched(True)
+        try:
+            async for _changes in awatch(settings.OUTPUT_DIR):
+                invalidate_output_cache()
+        finally:
+            mark_output_watched(False)
+
     # 使用 FastAPI lifespan 替代弃用的 on_event
     @asynccontextmanager
     async def lifespan(app):
-        # 启动时
-        listener_task = asyncio.create_task(workflow_listener())
-        print("[启动] 工作流监听器已启动")
+        # 启动时：并行预热重模块导入（线程里做，事件循环保持可响应）
+        await asyncio.gather(
+            *(asyncio.to_thread(importlib.import_module, m) for m in _HEAVY_MODULES)
+        )
+        from tools.mcp_manager import McpManager
+
+        mcp_mgr = mcp_state["mgr"] = McpManager()
+        # 后台预热 MCP 会话：不阻塞端口监听，首个工作流启动时子进程已就绪
+        prewarm_task = asyncio.create_task(mcp_mgr.prestart())
+        listener_task = asyncio.create_task(workflow_listener(mcp_mgr))
+        watcher_task = asyncio.create_task(output_watcher())
+        print("[启动] 工作流监听器已启动，MCP 会话预热中")
         yield
-        # 关闭时
+        # 关闭时：先取消在途工作流，再排空监听器，最后释放 MCP。
+        # 每步都加超时硬上限，保证 Ctrl-C / reload 不会卡死在清理上
+        workflow_task = bridge._workflow_task
+        if workflow_task is not None and not workflow_task.done():
+            workflow_task.cancel()
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(
+                    asyncio.gather(workflow_task, return_exceptions=True), timeout=5
+                )
         listener_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError, asyncio.TimeoutError):
+            await asyncio.wait_for(listener_task, timeout=5)
+        prewarm_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await prewarm_task
+        watcher_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await watcher_task
         await mcp_mgr.close()
+        from tools.file_tools import close_http_session
+
+        await close_http_session()
         print("[关闭] MCP 连接已释放")
 
     app.router.lifespan_context = lifespan
@@ -159,7 +274,17 @@ def run_web(port: int = 8000) -> None:
     print("=" * 60)
     print()
 
-    uvicorn.run(app, host="0.0.0.0", port=port, log_level="info")
+    # 显式要求 uvicorn[standard] 的 C 加速栈：httptools 解析 HTTP，
+    # websockets 的 C 扩展处理 WS 帧 — token 流式推送每帧都经过这两层
+    uvicorn.run(
+        app,
+        host="0.0.0.0",
+        port=port,
+        loop="uvloop" if uvloop is not None else "auto",
+        http="httptools",
+        ws="websockets",
+        log_level="info",
+    )
 
 
 # ============================================================
@@ -189,6 +314,8 @@ def main():
         if not args.links:
             parser.print_help()
             sys.exit(1)
+        if uvloop is not None:
+            uvloop.install()
         asyncio.run(run_cli(args.links))
 
 
@@ -9,7 +9,14 @@
 """
 import json
 import os
-from typing import Dict, List
+import threading
+from typing import Dict, List, Optional, Tuple
+
+# orjson（C 实现）解析 / 序列化比 stdlib json 快数倍，未安装时退回 stdlib
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 
 class RulesManager:
@@ -18,8 +25,29 @@ class RulesManager:
     def __init__(self, global_rules_path: str, coding_rules_path: str) -> None:
         self._global_rules_path = global_rules_path
         self._coding_rules_path = coding_rules_path
+        # 目录只需保证一次，省去每次保存时的 makedirs 系统调用
+        os.makedirs(os.path.dirname(global_rules_path), exist_ok=True)
+        os.makedirs(os.path.dirname(coding_rules_path), exist_ok=True)
         self._global_rules: Dict = self._load_json(global_rules_path)
         self._coding_rules: Dict = self._load_json(coding_rules_path)
+        # 全局规则 + 用户纠正点的合并元组 — 规则变化时重建，
+        # 查询路径零拼接零分配
+        self._all_rules: Tuple[str, ...] = self._merge_rules()
+        # 规则版本号 — 每次规则变化（写入 / 重载）时 +1，
+        # 供外部缓存（如智能体 system_message 的 lru_cache）作为失效键
+        self._version: int = 0
+        # 已渲染提示文本的 (版本, 文本) 缓存 — 每个智能体工厂都会调用
+        # get_*_prompt，规则未变时无需重复拼接
+        self._rules_prompt_cache: Optional[Tuple[int, str]] = None
+        self._coding_prompt_cache: Optional[Tuple[int, str]] = None
+        # 写路径互斥锁 — reload 可能在工作线程（asyncio.to_thread）执行，
+        # 与事件循环上的 add_user_correction 串行化
+        self._lock = threading.Lock()
+
+    @property
+    def version(self) -> int:
+        """当前规则版本号（单调递增，规则变化时 +1）。"""
+        return self._version
 
     # ------------------------------------------------------------------
     # 内部工具
@@ -27,42 +55,65 @@ class RulesManager:
 
     @staticmethod
     def _load_json(path: str) -> dict:
-        if os.path.exists(path):
+        # EAFP：直接 open，文件不存在时走异常路径 —
+        # 比 exists + open 少一次 stat 系统调用
+        try:
+            if orjson is not None:
+                with open(path, "rb") as f:
+                    return orjson.loads(f.read())
             with open(path, "r", encoding="utf-8") as f:
                 return json.load(f)
-        return {}
+        except FileNotFoundError:
+            return {}
 
     def _save_json(self, data: dict, path: str) -> None:
-        os.makedirs(os.path.dirname(path), exist_ok=True)
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        # 先整体序列化为 bytes，一次 write 写入临时文件后原子替换 —
+        # 进程中途被杀（Ctrl-C / uvicorn reload）也不会留下截断的规则文件
+        if orjson is not None:
+            # orjson 始终输出 UTF-8 且不转义非 ASCII，与 ensure_ascii=False 等价
+            data_bytes = orjson.dumps(data, option=orjson.OPT_INDENT_2)
+        else:
+            data_bytes = json.dumps(data, ensure_ascii=False, indent=2).encode("utf-8")
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(data_bytes)
+        os.replace(tmp, path)
 
     # ------------------------------------------------------------------
     # 查询
     # ------------------------------------------------------------------
 
-    def get_global_rules(self) -> List[str]:
-        """返回全局规则 + 用户纠正点的完整列表。"""
-        rules = self._global_rules.get("rules", [])
-        corrections = self._global_rules.get("user_corrections", [])
-        return rules + corrections
+    def _merge_rules(self) -> Tuple[str, ...]:
+        return tuple(self._global_rules.get("rules", [])) + tuple(
+            self._global_rules.get("user_corrections", [])
+        )
+
+    def get_global_rules(self) -> Tuple[str, ...]:
+        """返回全局规则 + 用户纠正点的完整元组（规则变化时才重建）。"""
+        return self._all_rules
 
     def get_coding_rules(self) -> Dict:
         """返回编码规范的完整字典。"""
         return self._coding_rules
 
     def get_rules_prompt(self) -> str:
-        """生成全局规则提示文本，用于注入智能体 system_message。"""
+        """生成全局规则提示文本，用于注入智能体 system_message（按版本缓存）。"""
+        if self._rules_prompt_cache is not None and self._rules_prompt_cache[0] == self._version:
+            return self._rules_prompt_cache[1]
         rules = self.get_global_rules()
         rules_text = "\n".join([f"  {i + 1}. {r}" for i, r in enumerate(rules)])
-        return (
+        prompt = (
             "【强制规则 — 任何情况下都不允许违反】\n"
             f"{rules_text}\n\n"
             "违反以上任何一条规则都将导致代码审核失败。"
         )
+        self._rules_prompt_cache = (self._version, prompt)
+        return prompt
 
     def get_coding_rules_prompt(self) -> str:
-        """生成编码规范提示文本，供代码审核智能体使用。"""
+        """生成编码规范提示文本，供代码审核智能体使用（按版本缓存）。"""
+        if self._coding_prompt_cache is not None and self._coding_prompt_cache[0] == self._version:
+            return self._coding_prompt_cache[1]
         lines: List[str] = ["【编码规范】"]
         for category, rules in self._coding_rules.items():
             lines.append(f"\n{category}:")
@@ -71,7 +122,9 @@ class RulesManager:
                     lines.append(f"  - {rule}")
             else:
                 lines.append(f"  - {rules}")
-        return "\n".join(lines)
+        prompt = "\n".join(lines)
+        self._coding_prompt_cache = (self._version, prompt)
+        return prompt
 
     # ------------------------------------------------------------------
     # 写入
@@ -79,16 +132,33 @@ class RulesManager:
 
     def add_user_correction(self, correction: str) -> None:
         """将用户纠正点追加到全局规则，并持久化。"""
-        if "user_corrections" not in self._global_rules:
-            self._global_rules["user_corrections"] = []
-        self._global_rules["user_corrections"].append(correction)
-        self._save_json(self._global_rules, self._global_rules_path)
+        with self._lock:
+            if "user_corrections" not in self._global_rules:
+                self._global_rules["user_corrections"] = []
+            self._global_rules["user_corrections"].append(correction)
+            self._save_json(self._global_rules, self._global_rules_path)
+            self._all_rules = self._merge_rules()
+            self._version += 1
 
     # ------------------------------------------------------------------
     # 热重载
     # ------------------------------------------------------------------
 
     def reload(self) -> None:
-        """重新从磁盘加载规则（用于外层循环每轮开始前）。"""
-        self._global_rules = self._load_json(self._global_rules_path)
-        self._coding_rules = self._load_json(self._coding_rules_path)
+        """重新从磁盘加载规则（用于外层循环每轮开始前）。
+
+        仅在规则内容实际变化时递增版本号 — 下游按版本缓存的
+        system_message / 智能体实例在规则未变时保持命中。
+
+        可在工作线程中调用（asyncio.to_thread），文件读取 + JSON 解析
+        不阻塞事件循环；与 add_user_correction 互斥。
+        """
+        new_global = self._load_json(self._global_rules_path)
+        new_coding = self._load_json(self._coding_rules_path)
+        with self._lock:
+            changed = new_global != self._global_rules or new_coding != self._coding_rules
+            self._global_rules = new_global
+            self._coding_rules = new_coding
+            if changed:
+                self._all_rules = self._merge_rules()
+                self._version += 1
@@ -1,11 +1,8 @@
 """测试 FunctionTool 到 模型调用 的完整链路"""
-import sys
 import os
 import asyncio
 import traceback
 
-sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-
 from tools.file_tools import write_file
 from autogen_core.tools import FunctionTool
 from autogen_core import CancellationToken
@@ -3,20 +3,74 @@
 
 供智能体使用，所有路径相对于 output/ 目录。
 包含：文件读写、图片下载保存、base64 图片保存。
+
+工具函数为 async：阻塞的磁盘 / 网络 I/O 通过 asyncio.to_thread
+移出事件循环，工具执行期间 token 流式推送与 MCP 通信不被卡住。
 """
+import asyncio
 import base64
 import os
+import time
 import urllib.request
+from typing import Optional
+
+# aiohttp 提供连接池 + keep-alive：同一工作流中多次下载 Figma CDN
+# 资源时复用 TCP/TLS 连接，省掉每次的握手往返。未安装时退回
+# to_thread + urllib 的无池化路径
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from autogen_core.tools import FunctionTool
 
 from config import settings
 
 
+# ============================================================
+# 共享 HTTP 会话（连接池）
+# ============================================================
+
+_http_session: Optional["aiohttp.ClientSession"] = None
+_http_session_lock = asyncio.Lock()
+
+
+async def _get_http_session() -> "aiohttp.ClientSession":
+    """返回模块级共享的 aiohttp 会话，首次调用时创建。"""
+    global _http_session
+    if _http_session is None or _http_session.closed:
+        async with _http_session_lock:
+            if _http_session is None or _http_session.closed:
+                _http_session = aiohttp.ClientSession(
+                    connector=aiohttp.TCPConnector(limit=32, keepalive_timeout=60),
+                    timeout=aiohttp.ClientTimeout(total=60),
+                )
+    return _http_session
+
+
+async def close_http_session() -> None:
+    """关闭共享 HTTP 会话（应用退出时调用）。"""
+    global _http_session
+    if _http_session is not None and not _http_session.closed:
+        await _http_session.close()
+    _http_session = None
+
+
 # ============================================================
 # 文本文件读写
 # ============================================================
 
 
-def write_file(file_path: str, content: str) -> str:
+def _write_file_sync(file_path: str, content: str) -> str:
+    full_path = os.path.join(settings.OUTPUT_DIR, file_path)
+    parent = os.path.dirname(full_path)
+    os.makedirs(parent if parent else settings.OUTPUT_DIR, exist_ok=True)
+    with open(full_path, "w", encoding="utf-8") as f:
+        f.write(content)
+    return f"文件已写入: {full_path}"
+
+
+async def write_file(file_path: str, content: str) -> str:
     """将内容写入指定文件（相对于输出目录）。
 
     Args:
@@ -26,28 +80,96 @@ def write_file(file_path: str, content: str) -> str:
     Returns:
         操作结果文本
     """
+    return await asyncio.to_thread(_write_file_sync, file_path, content)
+
+
+# read_file 单次读取上限：生成的 HTML/CSS 远小于此值，
+# 上限防止智能体误读大体积资源（截图等）占满内存 / 撑爆上下文
+_READ_FILE_MAX_BYTES = 2 * 1024 * 1024
+
+
+def _read_file_sync(file_path: str) -> str:
     full_path = os.path.join(settings.OUTPUT_DIR, file_path)
-    parent = os.path.dirname(full_path)
-    os.makedirs(parent if parent else settings.OUTPUT_DIR, exist_ok=True)
-    with open(full_path, "w", encoding="utf-8") as f:
-        f.write(content)
-    return f"文件已写入: {full_path}"
+    try:
+        size = os.stat(full_path).st_size
+    except FileNotFoundError:
+        return f"文件不存在: {full_path}"
+    if size > _READ_FILE_MAX_BYTES:
+        return (
+            f"文件过大，拒绝读取: {full_path} "
+            f"({size} 字节，上限 {_READ_FILE_MAX_BYTES} 字节)"
+        )
+    with open(full_path, "r", encoding="utf-8") as f:
+        return f.read(_READ_FILE_MAX_BYTES)
 
 
-def read_file(file_path: str) -> str:
+async def read_file(file_path: str) -> str:
     """读取指定文件的内容（相对于输出目录）。
 
     Args:
         file_path: 文件路径，相对于 output/ 目录（如 'index.html'）
 
     Returns:
-        文件内容或错误提示
+        文件内容或错误提示（文件超过 2MB 时拒绝读取）
     """
-    full_path = os.path.join(settings.OUTPUT_DIR, file_path)
-    if not os.path.exists(full_path):
-        return f"文件不存在: {full_path}"
-    with open(full_path, "r", encoding="utf-8") as f:
-        return f.read()
+    return await asyncio.to_thread(_read_file_sync, file_path)
+
+
+# output/ 文件列表缓存：(过期时刻, 顶层目录 mtime_ns, 路径列表)。
+# UI 轮询 /api/files 与智能体反复调用 list_output_files 共用同一份结果；
+# 顶层 mtime 捕捉大多数写入（index.html / styles.css 都在顶层），
+# 1 秒 TTL 兜底子目录内的变化
+_OUTPUT_LIST_TTL = 1.0
+_output_list_cache: Optional[tuple[float, int, list[str]]] = None
+# Web 模式下由 watchfiles（inotify）监听 output/ 并主动失效缓存；
+# 监听生效时读取路径完全不碰磁盘，mtime/TTL 检查只作为无监听时的回退
+_output_watch_active = False
+
+
+def invalidate_output_cache() -> None:
+    """丢弃文件列表缓存（目录监听器检测到变化时调用）。"""
+    global _output_list_cache
+    _output_list_cache = None
+
+
+def mark_output_watched(active: bool) -> None:
+    """声明 output/ 目录监听器的启停状态。"""
+    global _output_watch_active
+    _output_watch_active = active
+    invalidate_output_cache()
+
+
+def _scan_files(dir_path: str, rel_prefix: str, out: list[str]) -> None:
+    """递归 scandir：DirEntry 自带缓存的 stat，少一半 stat 系统调用。"""
+    with os.scandir(dir_path) as it:
+        for entry in it:
+            if entry.is_dir(follow_symlinks=False):
+                _scan_files(entry.path, rel_prefix + entry.name + "/", out)
+            elif entry.is_file(follow_symlinks=False):
+                out.append(rel_prefix + entry.name)
+
+
+def list_output_paths() -> list[str]:
+    """返回 output/ 下所有文件的相对路径（'/' 分隔）。
+
+    供 list_output_files 工具与 /api/files 路由共用，带短 TTL 缓存。
+    """
+    global _output_list_cache
+    cache = _output_list_cache
+    # 监听器在线时缓存由 inotify 事件失效，命中即返回，零系统调用
+    if _output_watch_active and cache is not None:
+        return cache[2]
+    try:
+        mtime = os.stat(settings.OUTPUT_DIR).st_mtime_ns
+    except FileNotFoundError:
+        return []
+    now = time.monotonic()
+    if cache is not None and cache[1] == mtime and now < cache[0]:
+        return cache[2]
+    files: list[str] = []
+    _scan_files(settings.OUTPUT_DIR, "", files)
+    _output_list_cache = (now + _OUTPUT_LIST_TTL, mtime, files)
+    return files
 
 
 def list_output_files() -> str:
@@ -56,13 +178,7 @@ def list_output_files() -> str:
     Returns:
         文件列表文本
     """
-    if not os.path.exists(settings.OUTPUT_DIR):
-        return "输出目录为空"
-    files = []
-    for root, _dirs, filenames in os.walk(settings.OUTPUT_DIR):
-        for filename in filenames:
-            rel_path = os.path.relpath(os.path.join(root, filename), settings.OUTPUT_DIR)
-            files.append(rel_path)
+    files = list_output_paths()
     return "\n".join(files) if files else "输出目录为空"
 
 
@@ -71,7 +187,21 @@ def list_output_files() -> str:
 # ============================================================
 
 
-def save_base64_image(filename: str, base64_data: str) -> str:
+def _save_base64_image_sync(filename: str, base64_data: str) -> str:
+    # 去掉可能的 data URI 前缀
+    if "," in base64_data:
+        base64_data = base64_data.split(",", 1)[1]
+
+    image_bytes = base64.b64decode(base64_data)
+    full_path = os.path.join(settings.OUTPUT_DIR, filename)
+    os.makedirs(os.path.dirname(full_path) if os.path.dirname(full_path) else settings.OUTPUT_DIR, exist_ok=True)
+
+    with open(full_path, "wb") as f:
+        f.write(image_bytes)
+    return f"图片已保存: {full_path}"
+
+
+async def save_base64_image(filename: str, base64_data: str) -> str:
     """将 base64 编码的图片数据保存到输出目录。
 
     Args:
@@ -81,20 +211,27 @@ def save_base64_image(filename: str, base64_data: str) -> str:
     Returns:
         保存后的完整文件路径
     """
-    # 去掉可能的 data URI 前缀
-    if "," in base64_data:
-        base64_data = base64_data.split(",", 1)[1]
+    return await asyncio.to_thread(_save_base64_image_sync, filename, base64_data)
 
-    image_bytes = base64.b64decode(base64_data)
+
+def _download_image_sync(url: str, filename: str) -> str:
     full_path = os.path.join(settings.OUTPUT_DIR, filename)
     os.makedirs(os.path.dirname(full_path) if os.path.dirname(full_path) else settings.OUTPUT_DIR, exist_ok=True)
 
+    try:
+        urllib.request.urlretrieve(url, full_path)
+        return f"图片已下载保存: {full_path}"
+    except Exception as e:
+        return f"图片下载失败: {type(e).__name__}: {e}"
+
+
+def _write_bytes_sync(full_path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(full_path) if os.path.dirname(full_path) else settings.OUTPUT_DIR, exist_ok=True)
     with open(full_path, "wb") as f:
-        f.write(image_bytes)
-    return f"图片已保存: {full_path}"
+        f.write(data)
 
 
-def download_image(url: str, filename: str) -> str:
+async def download_image(url: str, filename: str) -> str:
     """从 URL 下载图片并保存到输出目录。
 
     Args:
@@ -104,11 +241,59 @@ def download_image(url: str, filename: str) -> str:
     Returns:
         保存后的完整文件路径
     """
-    full_path = os.path.join(settings.OUTPUT_DIR, filename)
-    os.makedirs(os.path.dirname(full_path) if os.path.dirname(full_path) else settings.OUTPUT_DIR, exist_ok=True)
+    if aiohttp is None:
+        return await asyncio.to_thread(_download_image_sync, url, filename)
 
+    full_path = os.path.join(settings.OUTPUT_DIR, filename)
     try:
-        urllib.request.urlretrieve(url, full_path)
+        session = await _get_http_session()
+        async with session.get(url) as resp:
+            resp.raise_for_status()
+            data = await resp.read()
+        await asyncio.to_thread(_write_bytes_sync, full_path, data)
         return f"图片已下载保存: {full_path}"
     except Exception as e:
         return f"图片下载失败: {type(e).__name__}: {e}"
+
+
+async def download_images(urls: list[str], filenames: list[str]) -> str:
+    """并发下载多张图片并保存到输出目录。需要下载多张图片时优先使用本工具（而非逐张调用 download_image），所有图片会并行下载。
+
+    Args:
+        urls: 图片下载 URL 列表
+        filenames: 与 urls 一一对应的保存文件名列表（如 ['pc.png', 'mobile.png']）
+
+    Returns:
+        每张图片的下载结果，每行一条
+    """
+    if len(urls) != len(filenames):
+        return f"参数错误: urls 有 {len(urls)} 项而 filenames 有 {len(filenames)} 项，两者必须一一对应"
+    if not urls:
+        return "未提供要下载的图片"
+    results = await asyncio.gather(
+        *(download_image(url, filename) for url, filename in zip(urls, filenames))
+    )
+    return "\n".join(results)
+
+
+# ============================================================
+# 预构建的 FunctionTool 包装器
+# ============================================================
+
+# FunctionTool 构造时会用 inspect 解析签名生成 JSON schema（数百微秒），
+# 在导入时一次完成；智能体每轮重建时直接复用，schema 与
+# AssistantAgent 自动包装（description 取 __doc__）完全一致
+WRITE_FILE_TOOL = FunctionTool(write_file, description=write_file.__doc__ or "")
+READ_FILE_TOOL = FunctionTool(read_file, description=read_file.__doc__ or "")
+LIST_OUTPUT_FILES_TOOL = FunctionTool(
+    list_output_files, description=list_output_files.__doc__ or ""
+)
+SAVE_BASE64_IMAGE_TOOL = FunctionTool(
+    save_base64_image, description=save_base64_image.__doc__ or ""
+)
+DOWNLOAD_IMAGE_TOOL = FunctionTool(
+    download_image, description=download_image.__doc__ or ""
+)
+DOWNLOAD_IMAGES_TOOL = FunctionTool(
+    download_images, description=download_images.__doc__ or ""
+)
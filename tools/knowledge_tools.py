@@ -4,11 +4,75 @@
 注册为 AutoGen 工具供智能体调用，实现智能体与持久化知识库的交互。
 """
 import json
+import os
+from functools import lru_cache
+from typing import Optional, Tuple
+
+# orjson（C 实现）序列化搜索结果比 stdlib json 快数倍，未安装时退回 stdlib
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+from autogen_core.tools import FunctionTool
 
 from knowledge.knowledge_base import KnowledgeBase
 from config import settings
 
 
+# ============================================================
+# 进程内 KnowledgeBase 缓存
+# ============================================================
+
+# (文件指纹, 实例) — 智能体每次工具调用不再重新解析 JSON 快照，
+# 指纹覆盖快照与 WAL 两个文件，外部改动时自动重载
+_kb_cache: Optional[Tuple[Tuple[int, int], KnowledgeBase]] = None
+
+
+def _kb_stamp() -> Tuple[int, int]:
+    """知识库快照 + WAL 的 mtime_ns 组合，作为缓存失效标记。"""
+    stamp = []
+    for path in (settings.KNOWLEDGE_BASE_PATH, settings.KNOWLEDGE_BASE_PATH + ".jsonl"):
+        try:
+            stamp.append(os.stat(path).st_mtime_ns)
+        except FileNotFoundError:
+            stamp.append(-1)
+    return (stamp[0], stamp[1])
+
+
+def _get_kb() -> KnowledgeBase:
+    """返回缓存的 KnowledgeBase 实例，文件未变时零解析开销。"""
+    global _kb_cache
+    stamp = _kb_stamp()
+    if _kb_cache is not None and _kb_cache[0] == stamp:
+        return _kb_cache[1]
+    kb = KnowledgeBase.load(settings.KNOWLEDGE_BASE_PATH)
+    _kb_cache = (stamp, kb)
+    return kb
+
+
+def _refresh_kb_stamp(kb: KnowledgeBase) -> None:
+    """写入后刷新缓存指纹 — 内存中的实例已增量更新，无需重载。"""
+    global _kb_cache
+    _kb_cache = (_kb_stamp(), kb)
+
+
+@lru_cache(maxsize=256)
+def _search_serialized(stamp: Tuple[int, int], keyword: str) -> str:
+    """按 (文件指纹, 关键词) 缓存的搜索 + 序列化结果。
+
+    多个智能体在同一工作流中反复查询相同关键词（'flex'、'居中' 等），
+    指纹不变时重复查询退化为一次 lru_cache 字典查找；
+    知识库文件变化后指纹改变，旧条目自然失效。
+    """
+    results = _get_kb().search(keyword)
+    if not results:
+        return "未找到相关知识条目"
+    if orjson is not None:
+        return orjson.dumps(results, option=orjson.OPT_INDENT_2).decode()
+    return json.dumps(results, ensure_ascii=False, indent=2)
+
+
 def search_knowledge(keyword: str) -> str:
     """从公共知识库搜索 CSS 样式类、布局模式或编码经验。
 
@@ -18,11 +82,7 @@ def search_knowledge(keyword: str) -> str:
     Returns:
         匹配的知识条目（JSON 字符串），未找到时返回提示
     """
-    kb = KnowledgeBase.load(settings.KNOWLEDGE_BASE_PATH)
-    results = kb.search(keyword)
-    if results:
-        return json.dumps(results, ensure_ascii=False, indent=2)
-    return "未找到相关知识条目"
+    return _search_serialized(_kb_stamp(), keyword)
 
 
 def add_knowledge(category: str, name: str, description: str, code: str) -> str:
@@ -41,9 +101,10 @@ def add_knowledge(category: str, name: str, description: str, code: str) -> str:
     if category not in valid_categories:
         return f"无效分类 '{category}'，可选值: {', '.join(valid_categories)}"
 
-    kb = KnowledgeBase.load(settings.KNOWLEDGE_BASE_PATH)
+    kb = _get_kb()
     entry = {"name": name, "description": description, "code": code}
     kb.add_entry(category, entry)
+    _refresh_kb_stamp(kb)
     return f"已成功添加到知识库 [{category}] 分类: {name}"
 
 
@@ -53,5 +114,18 @@ def get_knowledge_summary() -> str:
     Returns:
         知识库的格式化文本
     """
-    kb = KnowledgeBase.load(settings.KNOWLEDGE_BASE_PATH)
+    kb = _get_kb()
     return kb.get_all_as_text()
+
+
+# ============================================================
+# 预构建的 FunctionTool 包装器（schema 在导入时解析一次）
+# ============================================================
+
+SEARCH_KNOWLEDGE_TOOL = FunctionTool(
+    search_knowledge, description=search_knowledge.__doc__ or ""
+)
+ADD_KNOWLEDGE_TOOL = FunctionTool(add_knowledge, description=add_knowledge.__doc__ or "")
+GET_KNOWLEDGE_SUMMARY_TOOL = FunctionTool(
+    get_knowledge_summary, description=get_knowledge_summary.__doc__ or ""
+)
@@ -17,18 +17,70 @@ MCP 服务统一生命周期管理器
       # ... 使用工具 ...
   # 退出时自动清理
 """
+import asyncio
 import contextlib
+import hashlib
+import json
+import os
+import time
 from typing import Optional
 
 from autogen_ext.tools.mcp import (
+    StdioMcpToolAdapter,
     StdioServerParams,
     create_mcp_server_session,
     mcp_server_tools,
 )
+from mcp.types import Tool
 
 from config import settings
 
 
+# ============================================================
+# 工具 schema 磁盘缓存
+# ============================================================
+
+# MCP 服务暴露的工具集跨运行基本不变 — 把 tools/list 的结果缓存到磁盘，
+# 温启动直接用缓存的 schema + 在线 session 重建适配器，省一次 MCP 往返。
+# 带 TTL 兜底服务端工具集演进；缓存键不含环境变量（避免泄漏 API key）
+_TOOL_SCHEMA_TTL_SECONDS = 24 * 3600
+
+
+def _tool_schema_cache_path(params: StdioServerParams) -> str:
+    digest = hashlib.sha256(
+        json.dumps([params.command, *params.args]).encode()
+    ).hexdigest()[:16]
+    return os.path.join(settings.OUTPUT_DIR, "mcp_tools", f"{digest}.json")
+
+
+def _load_cached_tool_schemas(path: str) -> Optional[list]:
+    """读取缓存的工具 schema 列表；缺失 / 过期 / 损坏时返回 None。"""
+    try:
+        if time.time() - os.stat(path).st_mtime > _TOOL_SCHEMA_TTL_SECONDS:
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+        return [Tool.model_validate(item) for item in raw]
+    except Exception:
+        return None
+
+
+def _save_tool_schemas(path: str, tools: list) -> None:
+    """原子写入工具 schema 缓存（写失败不影响主流程）。"""
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(
+                [t.model_dump(mode="json", exclude_none=True) for t in tools],
+                f,
+                ensure_ascii=False,
+            )
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
 class McpManager:
     """统一管理 Figma MCP 和 Browser MCP 的连接生命周期。
 
@@ -41,21 +93,57 @@ class McpManager:
     def __init__(self) -> None:
         self._figma_session = None
         self._figma_session_cm = None
-        self._figma_tools: Optional[list] = None
+        # 单飞（single-flight）记忆化：保存首次启动的 Task 而非结果，
+        # 并发调用共同 await 同一个 Task，保证子进程只拉起一次
+        self._figma_tools_task: Optional[asyncio.Task] = None
 
         self._browser_session = None
         self._browser_session_cm = None
-        self._browser_tools: Optional[list] = None
+        self._browser_tools_task: Optional[asyncio.Task] = None
+
+    async def _tools_from_cache_or_discover(self, params: StdioServerParams, session) -> list:
+        """优先用磁盘缓存的 schema 重建工具适配器，跳过 tools/list 往返。
+
+        缓存命中时先 ping 校验会话可用；ping 失败或重建出错则
+        退回完整发现，并把最新的 schema 写回缓存。
+        """
+        cache_path = _tool_schema_cache_path(params)
+        cached = _load_cached_tool_schemas(cache_path)
+        if cached is not None:
+            try:
+                await session.send_ping()
+                return [
+                    StdioMcpToolAdapter(server_params=params, tool=tool, session=session)
+                    for tool in cached
+                ]
+            except Exception:
+                pass
+        tools = await mcp_server_tools(params, session=session)
+        _save_tool_schemas(cache_path, [adapter._tool for adapter in tools])
+        return tools
 
     # ------------------------------------------------------------------
     # Figma MCP
     # ------------------------------------------------------------------
 
     async def get_figma_tools(self) -> list:
-        """获取 Figma MCP 工具列表，首次调用时启动 MCP 进程。"""
-        if self._figma_tools is not None:
-            return self._figma_tools
-
+        """获取 Figma MCP 工具列表，首次调用时启动 MCP 进程。
+
+        预热（prestart）和工作流可能并发进入 — 通过共享同一个启动
+        Task 避免竞态下重复拉起子进程；启动失败时清除 Task，
+        下次调用会重试并抛出真实错误。
+        """
+        if self._figma_tools_task is None:
+            self._figma_tools_task = asyncio.ensure_future(self._bootstrap_figma())
+        try:
+            return await asyncio.shield(self._figma_tools_task)
+        except Exception:
+            if self._figma_tools_task is not None and self._figma_tools_task.done():
+                self._figma_tools_task = None
+            raise
+
+    async def _bootstrap_figma(self) -> list:
+        """启动 Figma MCP 子进程并获取工具列表（只会被执行一次）。"""
         if not settings.FIGMA_API_KEY:
             raise ValueError(
                 "FIGMA_API_KEY 未配置！\n"
@@ -75,19 +163,29 @@ class McpManager:
         )(params)
         self._figma_session = await self._figma_session_cm.__aenter__()
 
-        # 用 session 复用连接获取工具
-        self._figma_tools = await mcp_server_tools(params, session=self._figma_session)
-        return self._figma_tools
+        # 用 session 复用连接获取工具（温启动走 schema 缓存）
+        return await self._tools_from_cache_or_discover(params, self._figma_session)
 
     # ------------------------------------------------------------------
     # Browser MCP
     # ------------------------------------------------------------------
 
     async def get_browser_tools(self) -> list:
-        """获取 Browser MCP 工具列表，首次调用时启动 MCP 进程。"""
-        if self._browser_tools is not None:
-            return self._browser_tools
-
+        """获取 Browser MCP 工具列表，首次调用时启动 MCP 进程。
+
+        与 get_figma_tools 相同的单飞语义。
+        """
+        if self._browser_tools_task is None:
+            self._browser_tools_task = asyncio.ensure_future(self._bootstrap_browser())
+        try:
+            return await asyncio.shield(self._browser_tools_task)
+        except Exception:
+            if self._browser_tools_task is not None and self._browser_tools_task.done():
+                self._browser_tools_task = None
+            raise
+
+    async def _bootstrap_browser(self) -> list:
+        """启动 Browser MCP 子进程并获取工具列表（只会被执行一次）。"""
         params = StdioServerParams(
             command=settings.BROWSER_MCP_COMMAND,
             args=settings.BROWSER_MCP_ARGS,
@@ -98,37 +196,54 @@ class McpManager:
         )(params)
         self._browser_session = await self._browser_session_cm.__aenter__()
 
-        self._browser_tools = await mcp_server_tools(params, session=self._browser_session)
-        return self._browser_tools
+        return await self._tools_from_cache_or_discover(params, self._browser_session)
 
     # ------------------------------------------------------------------
     # 生命周期
     # ------------------------------------------------------------------
 
+    async def prestart(self) -> None:
+        """并行预启动 Figma 与 Browser MCP 会话。
+
+        两个 stdio 子进程的冷启动（npx 拉起 + initialize 握手）各需数秒，
+        并行后总耗时从两者之和降为两者的最大值。预启动失败不在此抛出 —
+        留到首次真正取工具时带着清晰的报错信息重新抛出。
+        """
+        await asyncio.gather(
+            self.get_figma_tools(),
+            self.get_browser_tools(),
+            return_exceptions=True,
+        )
+
     async def close(self) -> None:
-        """关闭所有 MCP 连接，释放子进程资源。"""
-        errors = []
+        """关闭所有 MCP 连接，释放子进程资源。
 
+        两个会话并行关停（gather 收集异常），总耗时取两者的最大值
+        而非相加；无论成败，所有状态都被重置。
+        """
+        names = []
+        closers = []
         if self._figma_session_cm is not None:
-            try:
-                await self._figma_session_cm.__aexit__(None, None, None)
-            except Exception as e:
-                errors.append(f"Figma MCP 关闭失败: {e}")
-            finally:
-                self._figma_session = None
-                self._figma_session_cm = None
-                self._figma_tools = None
-
+            names.append("Figma MCP")
+            closers.append(self._figma_session_cm.__aexit__(None, None, None))
         if self._browser_session_cm is not None:
-            try:
-                await self._browser_session_cm.__aexit__(None, None, None)
-            except Exception as e:
-                errors.append(f"Browser MCP 关闭失败: {e}")
-            finally:
-                self._browser_session = None
-                self._browser_session_cm = None
-                self._browser_tools = None
+            names.append("Browser MCP")
+            closers.append(self._browser_session_cm.__aexit__(None, None, None))
+
+        results = await asyncio.gather(*closers, return_exceptions=True)
+
+        self._figma_session = None
+        self._figma_session_cm = None
+        self._figma_tools_task = None
+        self._browser_session = None
+        self._browser_session_cm = None
+        self._browser_tools_task = None
 
+        errors = [
+            f"{name} 关闭失败: {result}"
+            for name, result in zip(names, results)
+            if isinstance(result, BaseException)
+        ]
         if errors:
             print(f"[MCP] 关闭时出现错误: {'; '.join(errors)}")
 
@@ -3,10 +3,65 @@
 
 使用 SSIM（结构相似性指数）算法对比 Figma 设计稿截图与浏览器渲染截图。
 """
+import hashlib
+import os
+from functools import lru_cache
+
 import numpy as np
+from autogen_core.tools import FunctionTool
 from PIL import Image
 from skimage.metrics import structural_similarity as ssim
 
+# 粗算分数落在阈值（0.70）附近的灰区时才升到全分辨率重算，
+# 远离阈值的分数用 1/4 像素量的粗算结果即可定论
+_REFINE_BAND = (0.60, 0.80)
+
+
+def _files_identical(img1_path: str, img2_path: str) -> bool:
+    """字节级相同判定：先比大小，再比 SHA-256。"""
+    if os.path.getsize(img1_path) != os.path.getsize(img2_path):
+        return False
+    with open(img1_path, "rb") as f1, open(img2_path, "rb") as f2:
+        return (
+            hashlib.file_digest(f1, "sha256").digest()
+            == hashlib.file_digest(f2, "sha256").digest()
+        )
+
+
+def _ssim_at(img1_path: str, img2_path: str, size: tuple[int, int]) -> float:
+    """在指定分辨率下计算两张图的灰度 SSIM。"""
+    img1 = Image.open(img1_path).convert("L").resize(size)
+    img2 = Image.open(img2_path).convert("L").resize(size)
+
+    arr1 = np.array(img1)
+    arr2 = np.array(img2)
+
+    return float(ssim(arr1, arr2, win_size=7, data_range=255))
+
+
+def _file_fingerprint(path: str) -> tuple[str, int, int]:
+    """(路径, mtime_ns, 大小) — 文件未变时指纹不变。"""
+    st = os.stat(path)
+    return (path, st.st_mtime_ns, st.st_size)
+
+
+@lru_cache(maxsize=64)
+def _compare_cached(
+    key1: tuple[str, int, int],
+    key2: tuple[str, int, int],
+    target_size: tuple[int, int],
+) -> float:
+    """按两个文件的指纹缓存的 SSIM 计算（纯函数记忆化）。"""
+    img1_path, img2_path = key1[0], key2[0]
+    if _files_identical(img1_path, img2_path):
+        return 1.0
+
+    coarse_size = (target_size[0] // 2, target_size[1] // 2)
+    score = _ssim_at(img1_path, img2_path, coarse_size)
+    if _REFINE_BAND[0] < score < _REFINE_BAND[1]:
+        score = _ssim_at(img1_path, img2_path, target_size)
+    return score
+
 
 def compare_screenshots(
     img1_path: str,
@@ -15,6 +70,11 @@ def compare_screenshots(
 ) -> float:
     """比较两张截图的相似度。
 
+    快路径：文件字节相同直接返回 1.0（截图未变的复查轮次很常见）；
+    两个文件均未变时整个结果命中记忆化缓存，退化为一次字典查找。
+    慢路径：先在半分辨率（像素量 1/4）粗算 SSIM，分数明确高于 /
+    低于阈值灰区时直接采用；落在灰区才升到 target_size 全分辨率重算。
+
     Args:
         img1_path: 第一张图片的文件路径
         img2_path: 第二张图片的文件路径
@@ -23,14 +83,9 @@ def compare_screenshots(
     Returns:
         0‑1 之间的 SSIM 相似度分数
     """
-    img1 = Image.open(img1_path).convert("L").resize(target_size)
-    img2 = Image.open(img2_path).convert("L").resize(target_size)
-
-    arr1 = np.array(img1)
-    arr2 = np.array(img2)
-
-    score = ssim(arr1, arr2)
-    return float(score)
+    return _compare_cached(
+        _file_fingerprint(img1_path), _file_fingerprint(img2_path), target_size
+    )
 
 
 def compare_screenshots_tool(
@@ -59,3 +114,9 @@ def compare_screenshots_tool(
         return f"截图文件不存在: {e}"
     except Exception as e:
         return f"截图对比失败: {type(e).__name__}: {e}"
+
+
+# 预构建的 FunctionTool 包装器（schema 在导入时解析一次）
+COMPARE_SCREENSHOTS_TOOL = FunctionTool(
+    compare_screenshots_tool, description=compare_screenshots_tool.__doc__ or ""
+)
@@ -12,10 +12,15 @@ import sys
 from dataclasses import dataclass
 from typing import Optional
 
+# 模块级一次编译，属性访问路径上不再查 re 内部的 pattern 缓存
+# 支持 /design/ 和 /file/ 两种路径格式
+_FILE_KEY_RE = re.compile(r"figma\.com/(?:design|file)/([a-zA-Z0-9]+)")
+_NODE_ID_RE = re.compile(r"node-id=([0-9]+-[0-9]+)")
 
-@dataclass
+
+@dataclass(slots=True, frozen=True)
 class DesignInput:
-    """解析后的设计稿输入参数"""
+    """解析后的设计稿输入参数（解析后只读）"""
 
     pc_link: str
     pc_node_id: Optional[str] = None
@@ -41,14 +46,13 @@ class DesignInput:
     @staticmethod
     def _extract_file_key(link: str) -> Optional[str]:
         """从 Figma URL 中提取 file_key。"""
-        # 支持 /design/ 和 /file/ 两种路径格式
-        match = re.search(r"figma\.com/(?:design|file)/([a-zA-Z0-9]+)", link)
+        match = _FILE_KEY_RE.search(link)
         return match.group(1) if match else None
 
     @staticmethod
     def _extract_node_id_from_link(link: str) -> Optional[str]:
         """从 Figma URL 的 query string 中提取 node-id。"""
-        match = re.search(r"node-id=([0-9]+-[0-9]+)", link)
+        match = _NODE_ID_RE.search(link)
         if match:
             # Figma node id 使用冒号分隔（如 1:2），URL 中使用连字符（如 1-2）
             return match.group(1).replace("-", ":")
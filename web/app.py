@@ -16,13 +16,35 @@ from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 
 from config import settings
+from tools.file_tools import list_output_paths
 from web.bridge import WorkflowBridge
 
+# orjson 的 C 编码器序列化 API 响应（尤其是几百条消息的 history）
+# 比 stdlib json 快数倍，未安装时退回默认 JSONResponse。
+# fastapi 自带的 ORJSONResponse 已标记弃用（实例化即告警），自行子类化
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+
+    class _OrjsonResponse(JSONResponse):
+        def render(self, content) -> bytes:
+            return orjson.dumps(content)
+
+    _default_response_class = _OrjsonResponse
+else:
+    _default_response_class = JSONResponse
+
 # ============================================================
 # 全局状态
 # ============================================================
 
-app = FastAPI(title="Figma2Code 多智能体工作流")
+app = FastAPI(
+    title="Figma2Code 多智能体工作流",
+    default_response_class=_default_response_class,
+)
 bridge = WorkflowBridge()
 
 # 确保目录存在
@@ -52,29 +74,23 @@ async def index():
 @app.get("/api/history")
 async def get_history():
     """返回完整消息历史。"""
-    return JSONResponse(content={"messages": bridge.get_history()})
+    return {"messages": bridge.get_history()}
 
 
 @app.get("/api/files")
 async def get_files():
     """返回 output/ 目录的文件列表。"""
-    files = []
-    if os.path.exists(settings.OUTPUT_DIR):
-        for root, _dirs, filenames in os.walk(settings.OUTPUT_DIR):
-            for fname in filenames:
-                rel = os.path.relpath(os.path.join(root, fname), settings.OUTPUT_DIR)
-                files.append(rel.replace("\\", "/"))
-    return JSONResponse(content={"files": files})
+    return {"files": list_output_paths()}
 
 
 @app.get("/api/status")
 async def get_status():
     """返回工作流当前状态。"""
-    return JSONResponse(content={
+    return {
         "running": bridge.running,
         "waiting_for_input": bridge.waiting_for_input,
         "message_count": len(bridge.messages),
-    })
+    }
 
 
 # ============================================================
@@ -87,12 +103,12 @@ async def websocket_endpoint(websocket: WebSocket):
     """WebSocket 端点：实时推送消息 + 接收用户输入。"""
     await websocket.accept()
 
-    # 注册订阅
-    sub_queue = bridge.subscribe()
+    # 注册订阅（共享广播环上的读游标）
+    cursor = bridge.subscribe()
 
-    # 发送历史消息
+    # 发送历史消息（缓存的 JSON 串，重连回放不重复编码）
     for msg in bridge.messages:
-        await websocket.send_json(msg.to_dict())
+        await websocket.send_text(msg.to_json())
 
     # 发送当前状态
     await websocket.send_json({
@@ -104,14 +120,18 @@ async def websocket_endpoint(websocket: WebSocket):
     })
 
     async def send_task():
-        """持续从订阅队列读取新消息并推送到 WebSocket。"""
+        """持续从广播环批量取新消息并推送到 WebSocket。"""
         try:
             while True:
-                msg = await sub_queue.get()
-                if isinstance(msg, dict):
-                    await websocket.send_json(msg)
-                else:
-                    await websocket.send_json(msg.to_dict())
+                for msg in await cursor.drain():
+                    if isinstance(msg, str):
+                        # 预序列化的 chunk 帧，直接发送，跳过 send_json 重编码
+                        await websocket.send_text(msg)
+                    elif isinstance(msg, dict):
+                        await websocket.send_json(msg)
+                    else:
+                        # ChatMessage：每条消息全局只编码一次，N 个订阅者共享
+                        await websocket.send_text(msg.to_json())
         except Exception:
             pass
 
@@ -162,4 +182,4 @@ async def websocket_endpoint(websocket: WebSocket):
     finally:
         send.cancel()
         receive.cancel()
-        bridge.unsubscribe(sub_queue)
+        bridge.unsubscribe(cursor)
@@ -8,11 +8,26 @@ WorkflowBridge — 编排器与 Web UI 之间的异步消息桥接
   - 维护完整的消息历史，供新连接的 WebSocket 客户端回放
 """
 import asyncio
+import json
 import time
+from collections import deque
 from dataclasses import dataclass, field
+from itertools import islice
 
+# orjson（C 实现）序列化 chunk 帧比 stdlib json 快数倍，未安装时退回 stdlib
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-@dataclass
+# token chunk 的合并窗口（秒）— 窗口内到达的 token 合并为一帧推送，
+# 把每秒上百次的队列投递 / WS 发送压缩一到两个数量级
+_CHUNK_FLUSH_INTERVAL = 0.010
+
+
+# slots 去掉每实例的 __dict__（长会话会累积数千条历史消息），
+# frozen 保证消息一旦入历史就不可变
+@dataclass(slots=True, frozen=True)
 class ChatMessage:
     """单条聊天消息"""
 
@@ -20,14 +35,64 @@ class ChatMessage:
     content: str                                   # 消息内容
     timestamp: float = field(default_factory=time.time)
     msg_type: str = "agent"                        # agent / system / user / tool / error
+    # 同一条消息会被 /api/history 和每个订阅者反复字典化 / 序列化 —
+    # dict 在构造时算好一次，JSON 串首次用到时编码一次
+    _as_dict: dict = field(init=False, repr=False, compare=False)
+    _as_json: str | None = field(init=False, repr=False, compare=False, default=None)
 
-    def to_dict(self) -> dict:
-        return {
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "_as_dict", {
             "source": self.source,
             "content": self.content,
             "timestamp": self.timestamp,
             "msg_type": self.msg_type,
-        }
+        })
+
+    def to_dict(self) -> dict:
+        return self._as_dict
+
+    def to_json(self) -> str:
+        """消息的 JSON 串（首次调用时编码并缓存，之后直接复用）。"""
+        if self._as_json is None:
+            payload = (
+                orjson.dumps(self._as_dict).decode()
+                if orjson is not None
+                else json.dumps(self._as_dict, ensure_ascii=False)
+            )
+            object.__setattr__(self, "_as_json", payload)
+        return self._as_json
+
+
+class RingCursor:
+    """单个订阅者在共享广播环上的读游标。
+
+    订阅者各自记录读到的序号，共享同一份环形缓冲 —
+    生产者每条消息只做一次 append，成本与订阅者数量无关。
+    """
+
+    __slots__ = ("_bridge", "_next_seq")
+
+    def __init__(self, bridge: "WorkflowBridge") -> None:
+        self._bridge = bridge
+        self._next_seq = bridge._ring_seq
+
+    async def drain(self) -> list:
+        """取出游标之后的所有新消息（无新消息时挂起等待）。
+
+        消费太慢导致环上旧条目被挤掉时，直接跳到环内现存的
+        最早条目 — 慢客户端丢最旧的帧，不拖慢其他人。
+        """
+        bridge = self._bridge
+        while True:
+            available = bridge._ring_seq - self._next_seq
+            if available > 0:
+                ring = bridge._ring
+                if available > len(ring):
+                    available = len(ring)
+                items = list(islice(ring, len(ring) - available, len(ring)))
+                self._next_seq = bridge._ring_seq
+                return items
+            await bridge._tick.wait()
 
 
 class WorkflowBridge:
@@ -36,8 +101,10 @@ class WorkflowBridge:
     def __init__(self) -> None:
         # 编排器 → Web UI（多个 WebSocket 客户端可同时监听）
         self.message_queue: asyncio.Queue[ChatMessage] = asyncio.Queue()
-        # Web UI → 编排器（用户输入）
-        self.input_queue: asyncio.Queue[str] = asyncio.Queue()
+        # Web UI → 编排器（用户输入）。单消费者控制通道，
+        # 有界 deque + Event 比 asyncio.Queue 少每条消息的 Future 分配
+        self._inbox: deque[str] = deque(maxlen=64)
+        self._inbox_event: asyncio.Event = asyncio.Event()
         # 完整消息历史
         self.messages: list[ChatMessage] = []
         # 当前是否在等待用户输入
@@ -48,37 +115,67 @@ class WorkflowBridge:
         self.cancel_event: asyncio.Event = asyncio.Event()
         # 当前工作流任务引用（用于 cancel）
         self._workflow_task: asyncio.Task | None = None
-        # 已连接的 WebSocket 客户端
-        self._subscribers: list[asyncio.Queue] = []
+        # 广播环：所有订阅者共享一份缓冲，各自用游标读取。
+        # 生产者每条消息 O(1)，慢客户端最多积压 maxlen 条后丢最旧的
+        self._ring: deque = deque(maxlen=4096)
+        self._ring_seq: int = 0
+        self._tick: asyncio.Event = asyncio.Event()
+        # token chunk 合并缓冲与待触发的定时 flush
+        self._chunk_buf: list[str] = []
+        self._chunk_flush_handle: asyncio.TimerHandle | None = None
 
     # ------------------------------------------------------------------
     # 编排器 → Web UI
     # ------------------------------------------------------------------
 
+    def _publish(self, item) -> None:
+        """向广播环追加一条消息并唤醒所有等待的游标。"""
+        self._ring.append(item)
+        self._ring_seq += 1
+        # set() 立即唤醒当前所有 waiter，随手 clear 供下一轮等待
+        self._tick.set()
+        self._tick.clear()
+
     async def emit(self, source: str, content: str, msg_type: str = "agent") -> None:
         """编排器发送消息到 Web UI。"""
         msg = ChatMessage(source=source, content=content, msg_type=msg_type)
         self.messages.append(msg)
-        # 推送到所有已订阅的 WebSocket
-        for sub_queue in self._subscribers:
-            await sub_queue.put(msg)
+        self._publish(msg)
 
     def emit_chunk(self, token: str) -> None:
-        """同步推送 token chunk 到所有订阅者（用于 model_client 的 on_token 回调）。
+        """同步缓冲 token chunk（用于 model_client 的 on_token 回调）。
 
+        token 先进入合并缓冲，由 10ms 定时器统一 flush 为单帧推送 —
         不记录到 messages 历史（完整消息会由 agent 消息覆盖）。
         """
+        self._chunk_buf.append(token)
+        if self._chunk_flush_handle is None:
+            self._chunk_flush_handle = asyncio.get_running_loop().call_later(
+                _CHUNK_FLUSH_INTERVAL, self._flush_chunks
+            )
+
+    def _flush_chunks(self) -> None:
+        """将缓冲的 token 合并为一条 chunk 消息推送给所有订阅者。
+
+        JSON 只序列化一次：订阅者拿到的是现成的 str，WebSocket 发送端
+        直接 send_text，N 个订阅者共享 1 次编码而非各编各的。
+        """
+        self._chunk_flush_handle = None
+        if not self._chunk_buf:
+            return
         chunk_msg = {
             "source": "assistant",
-            "content": token,
+            "content": "".join(self._chunk_buf),
             "timestamp": time.time(),
             "msg_type": "chunk",
         }
-        for sub_queue in self._subscribers:
-            try:
-                sub_queue.put_nowait(chunk_msg)
-            except Exception:
-                pass  # 队列满时丢弃 chunk，不影响主流程
+        self._chunk_buf.clear()
+        payload = (
+            orjson.dumps(chunk_msg).decode()
+            if orjson is not None
+            else json.dumps(chunk_msg, ensure_ascii=False)
+        )
+        self._publish(payload)
 
     # ------------------------------------------------------------------
     # Web UI → 编排器
@@ -90,15 +187,31 @@ class WorkflowBridge:
         await self.emit("system", prompt, msg_type="input_request")
         # 通知所有订阅者状态变化
         await self._emit_status()
-        user_text = await self.input_queue.get()
+        user_text = await self.get_input()
         self.waiting_for_input = False
         # 记录用户输入为消息
         await self.emit("user", user_text, msg_type="user")
         return user_text
 
+    async def get_input(self) -> str:
+        """取出下一条 Web UI 输入（无输入时挂起等待）。
+
+        任一时刻只有一个消费者在等（工作流运行中是 request_input，
+        空闲时是 workflow_listener），无需队列级的多消费者协调。
+        """
+        while True:
+            if self._inbox:
+                text = self._inbox.popleft()
+                if not self._inbox:
+                    self._inbox_event.clear()
+                return text
+            self._inbox_event.clear()
+            await self._inbox_event.wait()
+
     async def provide_input(self, text: str) -> None:
         """Web UI 提供用户输入。"""
-        await self.input_queue.put(text)
+        self._inbox.append(text)
+        self._inbox_event.set()
 
     # ------------------------------------------------------------------
     # 取消工作流
@@ -123,16 +236,15 @@ class WorkflowBridge:
     # WebSocket 订阅管理
     # ------------------------------------------------------------------
 
-    def subscribe(self) -> asyncio.Queue:
-        """注册一个新的消息订阅者，返回其专属消息队列。"""
-        q: asyncio.Queue[ChatMessage] = asyncio.Queue()
-        self._subscribers.append(q)
-        return q
+    def subscribe(self) -> RingCursor:
+        """注册一个新的消息订阅者，返回其在广播环上的游标。
+
+        游标从当前位置开始读（历史消息由 WebSocket 端点单独回放）。
+        """
+        return RingCursor(self)
 
-    def unsubscribe(self, q: asyncio.Queue) -> None:
-        """注销订阅者。"""
-        if q in self._subscribers:
-            self._subscribers.remove(q)
+    def unsubscribe(self, cursor: RingCursor) -> None:
+        """注销订阅者。游标不占共享状态，丢弃引用即可，保留此方法作为配对 API。"""
 
     # ------------------------------------------------------------------
     # 状态推送
@@ -148,8 +260,7 @@ class WorkflowBridge:
             "running": self.running,
             "waiting_for_input": self.waiting_for_input,
         }
-        for sub_queue in self._subscribers:
-            await sub_queue.put(status_msg)
+        self._publish(status_msg)
 
     # ------------------------------------------------------------------
     # 工具方法
@@ -170,9 +281,6 @@ class WorkflowBridge:
         self.waiting_for_input = False
         self.cancel_event.clear()
         self._workflow_task = None
-        # 清空队列
-        while not self.input_queue.empty():
-            try:
-                self.input_queue.get_nowait()
-            except asyncio.QueueEmpty:
-                break
+        # 清空输入通道
+        self._inbox.clear()
+        self._inbox_event.clear()
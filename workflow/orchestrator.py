@@ -13,11 +13,18 @@
 """
 import asyncio
 import os
+from functools import lru_cache
 from typing import Optional
 
 from autogen_agentchat.base import TaskResult
 from autogen_agentchat.conditions import MaxMessageTermination, TextMentionTermination
+from autogen_agentchat.messages import (
+    ToolCallExecutionEvent,
+    ToolCallRequestEvent,
+    ToolCallSummaryMessage,
+)
 from autogen_agentchat.teams import RoundRobinGroupChat, SelectorGroupChat
+from autogen_core import CancellationToken
 
 from agents.figma_analyzer import create_figma_analyzer
 from agents.info_gatherer import create_info_gatherer
@@ -27,19 +34,75 @@ from agents.result_reviewer import create_result_reviewer
 from agents.group_admin import create_selector_prompt, custom_selector_func
 from config import settings
 from rules.rules_manager import RulesManager
-from tools.knowledge_tools import search_knowledge, add_knowledge, get_knowledge_summary
-from tools.file_tools import write_file, read_file, list_output_files, save_base64_image, download_image
+from tools.knowledge_tools import (
+    SEARCH_KNOWLEDGE_TOOL,
+    ADD_KNOWLEDGE_TOOL,
+    GET_KNOWLEDGE_SUMMARY_TOOL,
+)
+from tools.file_tools import (
+    WRITE_FILE_TOOL,
+    READ_FILE_TOOL,
+    LIST_OUTPUT_FILES_TOOL,
+    SAVE_BASE64_IMAGE_TOOL,
+    DOWNLOAD_IMAGE_TOOL,
+    DOWNLOAD_IMAGES_TOOL,
+)
 from tools.mcp_manager import McpManager
-from utils.image_compare import compare_screenshots_tool
+from utils.image_compare import COMPARE_SCREENSHOTS_TOOL
 from utils.input_parser import DesignInput
 
+# 输出目录只需保证一次 — 模块导入时创建，工作流入口不再每次 stat+mkdir
+os.makedirs(settings.OUTPUT_DIR, exist_ok=True)
+
+
+# ============================================================
+# 阶段横幅（模块级常量 — 循环内不再重建字符串对象）
+# ============================================================
+
+_STAGE1_BANNER = "📐 Stage 1/4: 分析 Figma 设计稿..."
+_STAGE1_REUSE_BANNER = "📐 Stage 1/4: 设计稿未变化，复用首轮 Figma 分析报告"
+_STAGE2_BANNER = "💻 Stage 2/4: 编写前端代码..."
+_STAGE3_BANNER = "🔍 Stage 3/4: 代码审核..."
+_STAGE4_BANNER = "🎨 Stage 4/4: 页面还原度审核..."
+
+
+# ============================================================
+# 终止条件（模块级单例）
+# ============================================================
+
+# 终止条件对象带内部状态（terminated 标志 / 消息计数），reset() 后可
+# 安全复用 — 构建一次，每次进入阶段前显式 reset（团队正常收尾会自行
+# reset，但提前退出 / 异常路径可能留下已终止状态），外层循环不再重建
+_ANALYSIS_TERMINATION = (
+    TextMentionTermination("## 编码建议")      # 分析报告完成标记
+    | TextMentionTermination("分析报告")        # 备用标记
+    | MaxMessageTermination(15)                 # 防止无限循环
+)
+_CODE_TERMINATION = (
+    TextMentionTermination("文件已写入")
+    | MaxMessageTermination(10)
+)
+_REVIEW_TERMINATION = (
+    TextMentionTermination("REVIEW_APPROVED")
+    | MaxMessageTermination(settings.MAX_REFLECTION_ROUNDS * 2)
+)
+_RESULT_TERMINATION = (
+    TextMentionTermination("RESULT_APPROVED")
+    | MaxMessageTermination(settings.MAX_REFLECTION_ROUNDS * 2)
+)
+
 
 # ============================================================
 # 任务提示词构建
 # ============================================================
 
-def build_task_prompt(design_input: DesignInput, correction: Optional[str] = None) -> str:
-    """根据设计稿输入参数构建任务提示词。"""
+@lru_cache(maxsize=32)
+def _build_prompt_prefix(design_input: DesignInput) -> str:
+    """构建任务提示词的固定前缀（链接 / 节点 ID 部分）。
+
+    DesignInput 是 frozen dataclass，可作 lru_cache 键 — 外层纠正循环
+    每轮重建提示词时，链接解析（get_*_node_id 的正则）与拼接只做一次。
+    """
     parts: list[str] = [
         "请根据以下 Figma 设计稿生成前端页面代码。\n",
         f"**PC 端设计稿链接**: {design_input.pc_link}",
@@ -55,40 +118,60 @@ def build_task_prompt(design_input: DesignInput, correction: Optional[str] = Non
         if mobile_node_id:
             parts.append(f"**手机端节点 ID**: {mobile_node_id}")
 
-    if correction:
-        parts.extend([
-            "",
-            "━━━━━━━━━━━━━━━━━━━━",
-            "⚠️ 用户上轮纠正点（已加入规则）",
-            "━━━━━━━━━━━━━━━━━━━━",
-            correction,
-            "",
-            "请特别注意以上纠正点进行针对性优化。",
-        ])
-
     return "\n".join(parts)
 
 
+_CORRECTION_TEMPLATE = (
+    "\n"
+    "\n━━━━━━━━━━━━━━━━━━━━"
+    "\n⚠️ 用户上轮纠正点（已加入规则）"
+    "\n━━━━━━━━━━━━━━━━━━━━"
+    "\n{correction}"
+    "\n"
+    "\n请特别注意以上纠正点进行针对性优化。"
+)
+
+
+def build_task_prompt(design_input: DesignInput, correction: Optional[str] = None) -> str:
+    """根据设计稿输入参数构建任务提示词（前缀按输入记忆化）。"""
+    prefix = _build_prompt_prefix(design_input)
+    if correction:
+        return prefix + _CORRECTION_TEMPLATE.format(correction=correction)
+    return prefix
+
+
 # ============================================================
 # 消息格式化
 # ============================================================
 
+# 按消息类精确分派展示类型 — 每条流式消息一次 dict 查找，
+# 替代原先的 type(msg).__name__ 取名 + "ToolCall" 子串扫描
+_TOOL_DISPLAY_TYPES = {
+    ToolCallRequestEvent: "tool",
+    ToolCallExecutionEvent: "tool",
+    ToolCallSummaryMessage: "tool",
+}
+
+def _fmt_item(item) -> str:
+    """格式化消息列表中的单个条目（工具调用 / 其他）。"""
+    if hasattr(item, "name"):
+        args = getattr(item, "arguments", "")
+        # 只做一次 str 转换；常见的短参数路径不切片
+        s = args if isinstance(args, str) else str(args)
+        if len(s) > 200:
+            s = s[:200] + "..."
+        return f"[调用工具] {item.name}({s})"
+    return str(item)
+
+
 def _format_message_content(msg) -> str:
     """将各类消息内容转换为文本。"""
     content = getattr(msg, "content", "")
     if isinstance(content, str):
         return content
     if isinstance(content, list):
-        parts = []
-        for item in content:
-            if hasattr(item, "name"):
-                args_str = getattr(item, "arguments", "")
-                if len(str(args_str)) > 200:
-                    args_str = str(args_str)[:200] + "..."
-                parts.append(f"[调用工具] {item.name}({args_str})")
-            else:
-                parts.append(str(item))
-        return "\n".join(parts)
+        # map + join 在 C 层完成迭代与拼接，省去中间列表的分配与 append
+        return "\n".join(map(_fmt_item, content))
     return str(content)
 
 
@@ -125,7 +208,14 @@ async def run_workflow_web(design_input: DesignInput, model_client, mcp_mgr: Mcp
 # 通用：运行一个阶段并收集消息
 # ============================================================
 
-async def _run_stage(team, task: str, stage_name: str, log_fn, check_cancel_fn) -> str:
+async def _run_stage(
+    team,
+    task: str,
+    stage_name: str,
+    log_fn,
+    check_cancel_fn,
+    term_tokens: tuple[str, ...] = (),
+) -> str:
     """运行一个阶段（team.run_stream），收集所有消息内容，返回最后一条有效消息。
 
     Args:
@@ -134,33 +224,59 @@ async def _run_stage(team, task: str, stage_name: str, log_fn, check_cancel_fn)
         stage_name: 阶段名称（用于日志）
         log_fn: 日志函数 async (source, content, msg_type)
         check_cancel_fn: 取消检查函数
+        term_tokens: 终止标记子串 — 消息中一出现就提前退出，
+            不等 team 走完终止条件判定 / TaskResult 收尾
 
     Returns:
         最后一条有效消息的内容文本
     """
     last_content = ""
     msg_count = 0
-
-    async for msg in team.run_stream(task=task):
-        check_cancel_fn()
-
-        if isinstance(msg, TaskResult):
-            await log_fn("system", f"[{stage_name}] 阶段完成（共 {msg_count} 条消息）")
-            break
-
-        source = getattr(msg, "source", "unknown")
-        content = _format_message_content(msg)
-        msg_type_name = type(msg).__name__
-
-        if "ToolCall" in msg_type_name:
-            display_type = "tool"
-        else:
-            display_type = "agent"
-
-        if content:
-            await log_fn(source, content, msg_type=display_type)
-            last_content = content
-            msg_count += 1
+    # 生产 / 消费分离：流消费者只做格式化 + 入队，日志输出
+    # （CLI 的 print 可能被慢终端阻塞）由独立 worker 串行排空，
+    # 不再拖慢 team.run_stream 的下一次 yield
+    out_q: asyncio.Queue = asyncio.Queue(maxsize=256)
+
+    async def _emit_worker() -> None:
+        while True:
+            item = await out_q.get()
+            if item is None:
+                return
+            source, content, msg_type = item
+            await log_fn(source, content, msg_type=msg_type)
+
+    async with asyncio.TaskGroup() as tg:
+        tg.create_task(_emit_worker())
+        # 正常路径末尾入队 None 让 worker 排空后退出；
+        # 异常 / 取消时 TaskGroup 直接撤销 worker，残留日志随之丢弃
+        async for msg in team.run_stream(task=task):
+            check_cancel_fn()
+
+            cls = type(msg)
+            if cls is TaskResult:
+                await out_q.put(
+                    ("system", f"[{stage_name}] 阶段完成（共 {msg_count} 条消息）", "system")
+                )
+                break
+
+            source = getattr(msg, "source", "unknown")
+            content = _format_message_content(msg)
+            display_type = _TOOL_DISPLAY_TYPES.get(cls, "agent")
+
+            if content:
+                await out_q.put((source, content, display_type))
+                last_content = content
+                msg_count += 1
+                # 终止标记只会出现在消息尾部附近，截尾扫描即可
+                tail = content[-512:]
+                if term_tokens and any(tok in tail for tok in term_tokens):
+                    await out_q.put((
+                        "system",
+                        f"[{stage_name}] 检测到终止标记，提前结束（共 {msg_count} 条消息）",
+                        "system",
+                    ))
+                    break
+        await out_q.put(None)
 
     return last_content
 
@@ -172,7 +288,6 @@ async def _run_stage(team, task: str, stage_name: str, log_fn, check_cancel_fn)
 async def _run_workflow_internal(design_input: DesignInput, model_client, mcp_mgr: McpManager, bridge=None) -> None:
     """内部统一工作流逻辑 — 分阶段执行。"""
     is_web = bridge is not None
-    os.makedirs(settings.OUTPUT_DIR, exist_ok=True)
 
     # 辅助函数
     async def log(source: str, content: str, msg_type: str = "system"):
@@ -202,41 +317,77 @@ async def _run_workflow_internal(design_input: DesignInput, model_client, mcp_mg
     # ------------------------------------------------------------------
     # 通过 McpManager 获取 MCP 工具（复用持久连接）
     # ------------------------------------------------------------------
-    await log("system", "正在连接 Figma MCP 服务...")
-    try:
-        figma_tools = await mcp_mgr.get_figma_tools()
-        await log("system", f"Figma MCP 就绪，加载了 {len(figma_tools)} 个工具")
-    except ValueError as e:
-        await log("system", f"错误: {e}", msg_type="error")
-        raise
-    except Exception as e:
-        await log("system", f"Figma MCP 连接失败: {type(e).__name__}: {e}", msg_type="error")
-        raise
-
-    check_cancel()
+    # 两个 MCP 服务并行连接（冷启动耗时取两者的最大值而非相加；
+    # 预热过的场景直接命中单飞 Task）
+    await log("system", "正在连接 Figma MCP 与 Browser MCP 服务...")
+    figma_result, browser_result = await asyncio.gather(
+        mcp_mgr.get_figma_tools(),
+        mcp_mgr.get_browser_tools(),
+        return_exceptions=True,
+    )
 
-    await log("system", "正在连接 Browser MCP 服务...")
-    try:
-        browser_tools = await mcp_mgr.get_browser_tools()
-        await log("system", f"Browser MCP 就绪，加载了 {len(browser_tools)} 个工具")
-    except Exception as e:
-        await log("system", f"Browser MCP 连接失败: {type(e).__name__}: {e}", msg_type="error")
-        raise
+    if isinstance(figma_result, BaseException):
+        if isinstance(figma_result, ValueError):
+            await log("system", f"错误: {figma_result}", msg_type="error")
+        else:
+            await log(
+                "system",
+                f"Figma MCP 连接失败: {type(figma_result).__name__}: {figma_result}",
+                msg_type="error",
+            )
+        raise figma_result
+    figma_tools = figma_result
+    await log("system", f"Figma MCP 就绪，加载了 {len(figma_tools)} 个工具")
+
+    if isinstance(browser_result, BaseException):
+        await log(
+            "system",
+            f"Browser MCP 连接失败: {type(browser_result).__name__}: {browser_result}",
+            msg_type="error",
+        )
+        raise browser_result
+    browser_tools = browser_result
+    await log("system", f"Browser MCP 就绪，加载了 {len(browser_tools)} 个工具")
 
     check_cancel()
 
     # ------------------------------------------------------------------
-    # 本地工具
+    # 本地工具（模块导入时已包装为 FunctionTool，schema 只解析一次）
     # ------------------------------------------------------------------
-    knowledge_tools = [search_knowledge, add_knowledge, get_knowledge_summary]
-    file_tools = [write_file, read_file, list_output_files, save_base64_image, download_image]
-    image_tools = [compare_screenshots_tool]
+    knowledge_tools = [SEARCH_KNOWLEDGE_TOOL, ADD_KNOWLEDGE_TOOL, GET_KNOWLEDGE_SUMMARY_TOOL]
+    file_tools = [
+        WRITE_FILE_TOOL,
+        READ_FILE_TOOL,
+        LIST_OUTPUT_FILES_TOOL,
+        SAVE_BASE64_IMAGE_TOOL,
+        DOWNLOAD_IMAGE_TOOL,
+        DOWNLOAD_IMAGES_TOOL,
+    ]
+    image_tools = [COMPARE_SCREENSHOTS_TOOL]
 
     # ------------------------------------------------------------------
     # 构建任务提示
     # ------------------------------------------------------------------
     task_prompt = build_task_prompt(design_input)
 
+    # 智能体缓存：按规则版本复用实例，规则未变的反馈轮次跳过重建；
+    # 复用前重置会话上下文，语义与逐轮新建完全一致
+    agent_cache: dict[int, tuple] = {}
+
+    # 首轮产出的 Figma 分析报告 — 设计稿在一次运行内不会变化，
+    # 纠正轮次直接复用，省掉整个 Stage 1 的 LLM 分析
+    cached_analysis: Optional[str] = None
+
+    # info_gatherer 无模型上下文、无规则依赖，输入回调只闭包常量 bridge —
+    # 循环外构建一次即可。UserProxyAgent 原生支持异步输入函数，直接
+    # await bridge，不经线程池（原实现每次提问都占用一个工作线程阻塞等待）
+    if is_web:
+        async def _web_input_func(prompt: str, cancellation_token=None) -> str:
+            return await bridge.request_input(prompt)
+        info_gatherer = create_info_gatherer(input_func=_web_input_func)
+    else:
+        info_gatherer = create_info_gatherer()
+
     # ==================================================================
     # 外层循环：用户反馈
     # ==================================================================
@@ -244,132 +395,147 @@ async def _run_workflow_internal(design_input: DesignInput, model_client, mcp_mg
     while True:
         iteration += 1
         check_cancel()
-        rules_manager.reload()
-
-        # 创建智能体（每轮重建以获取最新规则）
-        figma_analyzer = create_figma_analyzer(
-            model_client=model_client,
-            figma_tools=figma_tools,
-            knowledge_tools=knowledge_tools,
-            rules_manager=rules_manager,
-        )
-        if is_web:
-            _loop = asyncio.get_running_loop()
-            def _web_input_func(prompt: str) -> str:
-                future = asyncio.run_coroutine_threadsafe(bridge.request_input(prompt), _loop)
-                return future.result(timeout=600)
-            info_gatherer = create_info_gatherer(input_func=_web_input_func)
+        # 文件读取 + JSON 解析放到线程池，事件循环继续排空 WebSocket 推送
+        await asyncio.to_thread(rules_manager.reload)
+
+        cached_agents = agent_cache.get(rules_manager.version)
+        if cached_agents is not None:
+            figma_analyzer, code_writer, code_reviewer, result_reviewer = cached_agents
+            await asyncio.gather(
+                *(agent.on_reset(CancellationToken()) for agent in cached_agents)
+            )
         else:
-            info_gatherer = create_info_gatherer()
-
-        code_writer = create_code_writer(
-            model_client=model_client,
-            knowledge_tools=knowledge_tools,
-            file_tools=file_tools,
-            rules_manager=rules_manager,
-        )
-        code_reviewer = create_code_reviewer(
-            model_client=model_client,
-            file_tools=file_tools,
-            rules_manager=rules_manager,
-        )
-        result_reviewer = create_result_reviewer(
-            model_client=model_client,
-            figma_tools=figma_tools,
-            browser_tools=browser_tools,
-            image_compare_tools=image_tools,
-            file_tools=file_tools,
-            rules_manager=rules_manager,
-        )
+            figma_analyzer = create_figma_analyzer(
+                model_client=model_client,
+                figma_tools=figma_tools,
+                knowledge_tools=knowledge_tools,
+                rules_manager=rules_manager,
+            )
+            code_writer = create_code_writer(
+                model_client=model_client,
+                knowledge_tools=knowledge_tools,
+                file_tools=file_tools,
+                rules_manager=rules_manager,
+            )
+            code_reviewer = create_code_reviewer(
+                model_client=model_client,
+                file_tools=file_tools,
+                rules_manager=rules_manager,
+            )
+            result_reviewer = create_result_reviewer(
+                model_client=model_client,
+                figma_tools=figma_tools,
+                browser_tools=browser_tools,
+                image_compare_tools=image_tools,
+                file_tools=file_tools,
+                rules_manager=rules_manager,
+            )
+            # 只保留当前规则版本的一组实例
+            agent_cache.clear()
+            agent_cache[rules_manager.version] = (
+                figma_analyzer, code_writer, code_reviewer, result_reviewer,
+            )
 
         await log("system", f"═══ 第 {iteration} 轮工作流开始 ═══")
 
         # ==============================================================
         # Stage 1: Figma 分析
         # ==============================================================
-        await log("system", "📐 Stage 1/4: 分析 Figma 设计稿...", msg_type="stage")
-
-        # 用 SelectorGroupChat 处理 figma_analyzer + info_gatherer 的交互
-        analysis_termination = (
-            TextMentionTermination("## 编码建议")      # 分析报告完成标记
-            | TextMentionTermination("分析报告")        # 备用标记
-            | MaxMessageTermination(15)                 # 防止无限循环
-        )
-        roles_info = "\n".join([
-            f"- **{p.name}**: {p.description}"
-            for p in [figma_analyzer, info_gatherer]
-        ])
-        analysis_team = SelectorGroupChat(
-            participants=[figma_analyzer, info_gatherer],
-            model_client=model_client,
-            selector_prompt=create_selector_prompt(roles_info),
-            termination_condition=analysis_termination,
-            allow_repeated_speaker=True,
-        )
-        analysis_result = await _run_stage(
-            analysis_team, task_prompt, "Figma 分析", log, check_cancel
-        )
+        if cached_analysis is not None:
+            # 纠正轮次：设计稿未变（同一次运行中链接 / 节点固定），
+            # 复用首轮报告；纠正点已通过规则与任务提示进入 Stage 2+
+            analysis_result = cached_analysis
+            await log(
+                "system",
+                _STAGE1_REUSE_BANNER,
+                msg_type="stage",
+            )
+        else:
+            await log("system", _STAGE1_BANNER, msg_type="stage")
+
+            # 用 SelectorGroupChat 处理 figma_analyzer + info_gatherer 的交互
+            await _ANALYSIS_TERMINATION.reset()
+            roles_info = "\n".join([
+                f"- **{p.name}**: {p.description}"
+                for p in [figma_analyzer, info_gatherer]
+            ])
+            analysis_team = SelectorGroupChat(
+                participants=[figma_analyzer, info_gatherer],
+                model_client=model_client,
+                selector_prompt=create_selector_prompt(roles_info),
+                termination_condition=_ANALYSIS_TERMINATION,
+                allow_repeated_speaker=True,
+            )
+            analysis_result = await _run_stage(
+                analysis_team,
+                task_prompt,
+                "Figma 分析",
+                log,
+                check_cancel,
+                term_tokens=("## 编码建议", "分析报告"),
+            )
+            if analysis_result:
+                cached_analysis = analysis_result
 
         check_cancel()
 
         # ==============================================================
         # Stage 2: 代码编写
         # ==============================================================
-        await log("system", "💻 Stage 2/4: 编写前端代码...", msg_type="stage")
+        await log("system", _STAGE2_BANNER, msg_type="stage")
 
         code_task = (
             f"根据以下 Figma 分析报告生成 HTML/CSS 代码，"
             f"**必须调用 write_file 保存文件**。\n\n{analysis_result}"
         )
-        code_termination = (
-            TextMentionTermination("文件已写入")
-            | MaxMessageTermination(10)
-        )
+        await _CODE_TERMINATION.reset()
         code_team = RoundRobinGroupChat(
             participants=[code_writer],
-            termination_condition=code_termination,
+            termination_condition=_CODE_TERMINATION,
+        )
+        await _run_stage(
+            code_team, code_task, "代码编写", log, check_cancel,
+            term_tokens=("文件已写入",),
         )
-        await _run_stage(code_team, code_task, "代码编写", log, check_cancel)
 
         check_cancel()
 
         # ==============================================================
         # Stage 3: 代码审核循环
         # ==============================================================
-        await log("system", "🔍 Stage 3/4: 代码审核...", msg_type="stage")
+        await log("system", _STAGE3_BANNER, msg_type="stage")
 
-        max_review_rounds = settings.MAX_REFLECTION_ROUNDS
-        review_termination = (
-            TextMentionTermination("REVIEW_APPROVED")
-            | MaxMessageTermination(max_review_rounds * 2)
-        )
+        await _REVIEW_TERMINATION.reset()
         review_team = RoundRobinGroupChat(
             participants=[code_reviewer, code_writer],
-            termination_condition=review_termination,
+            termination_condition=_REVIEW_TERMINATION,
         )
         review_task = "请审核 output/ 目录中的 index.html 和 styles.css，检查是否符合编码规范。"
-        await _run_stage(review_team, review_task, "代码审核", log, check_cancel)
+        await _run_stage(
+            review_team, review_task, "代码审核", log, check_cancel,
+            term_tokens=("REVIEW_APPROVED",),
+        )
 
         check_cancel()
 
         # ==============================================================
         # Stage 4: 结果审核循环
         # ==============================================================
-        await log("system", "🎨 Stage 4/4: 页面还原度审核...", msg_type="stage")
+        await log("system", _STAGE4_BANNER, msg_type="stage")
 
-        result_termination = (
-            TextMentionTermination("RESULT_APPROVED")
-            | MaxMessageTermination(max_review_rounds * 2)
-        )
+        await _RESULT_TERMINATION.reset()
         result_team = RoundRobinGroupChat(
             participants=[result_reviewer, code_writer],
-            termination_condition=result_termination,
+            termination_condition=_RESULT_TERMINATION,
         )
         result_task = (
             "请对比 Figma 设计稿与浏览器渲染效果的还原度。"
             "使用 get_images 获取设计稿图片，用 browser 工具截图，然后对比。"
         )
-        await _run_stage(result_team, result_task, "结果审核", log, check_cancel)
+        await _run_stage(
+            result_team, result_task, "结果审核", log, check_cancel,
+            term_tokens=("RESULT_APPROVED",),
+        )
 
         check_cancel()
 